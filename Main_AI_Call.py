@@ -6,6 +6,7 @@ from tasks.poll_queue import poll_queue
 from tasks.check_status_second import call_status_check
 from logger.logger_config import logger
 from config.config_loader import ConfigLoader
+from utils.dedup import RecentMessageSet
 
 
 import websockets
@@ -21,10 +22,16 @@ import websockets
 
 
 shared_data = {
-    "call_instance_list":[]
+    "call_instance_list":[],
+    # message_id -> entry of call_instance_list, so status checks don't scan the list
+    "call_instance_by_message_id":{}
 }
 queue_messages = {
-    "message_list":[]
+    "message_list":[],
+    # MessageIds of messages being handled, for O(1) "already in call" checks
+    "message_ids":set(),
+    # MessageId -> latest SQS receipt handle, used to delete the message once its call ends
+    "receipt_handles":{}
 }
 call_status_mapping = {
 
@@ -40,7 +47,7 @@ call_status_mapping = {
 
 # duplicate_message_set is a small fix up and advised to be removed . It is essentially checking for unique messages in sqs . We needed it as we could not control asyncrnous deleteion of message.
 # It wont affect in small scale. But needs to be change for project,
-duplicate_message_set = set()
+duplicate_message_set = RecentMessageSet(maxsize=10000)
 
 
 async def main():
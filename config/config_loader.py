@@ -4,11 +4,19 @@ class ConfigLoader:
     def __init__(self, config_file: str = "config.ini"):
         self.config = configparser.ConfigParser()
         self.config.read(config_file)
+        # Resolved values, keyed by (section, key)
+        self.cache = {}
 
     def get(self, section: str, key: str, fallback=None):
         try:
-            return self.config.get(section, key)
+            return self.cache[(section, key)]
+        except KeyError:
+            pass
+        try:
+            value = self.config.get(section, key)
         except (configparser.NoSectionError, configparser.NoOptionError):
             if fallback is not None:
                 return fallback
             raise KeyError(f"Key '{key}' not found in section '{section}'")
+        self.cache[(section, key)] = value
+        return value
@@ -9,6 +9,8 @@ import os
 import sys
 import logging
 import argparse
+import functools
+from types import SimpleNamespace
 from twilio.rest import Client
 from config.config_loader import ConfigLoader
 import requests
@@ -17,6 +19,20 @@ import requests
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(levelname)s|%(name)s] %(message)s')
 logger = logging.getLogger('demo_call')
 
+@functools.lru_cache(maxsize=1)
+def load_twilio_settings():
+    """Read the Twilio settings from config.ini once and create the REST client"""
+    config = ConfigLoader(config_file="config.ini")
+    account_sid = config.get('twilio', 'TWILIO_ACCOUNT_SID')
+    auth_token = config.get('twilio', 'TWILIO_TOKEN')
+    logger.info(f"Initializing Twilio client with SID: {account_sid[:5]}...")
+    return SimpleNamespace(
+        from_number=config.get('twilio', 'TWILIO_PHONE_NO'),
+        # Use the ngrok URL from config for external calls
+        websocket_url=config.get('twilio', 'WEBSOCKET_URL'),
+        client=Client(account_sid, auth_token)
+    )
+
 def make_demo_call(phone_number=None):
     """
     Make a direct call to the specified phone number using Twilio
@@ -25,14 +41,11 @@ def make_demo_call(phone_number=None):
     Args:
         phone_number (str): Phone number to call with country code (e.g., +1234567890)
     """
-    # Load configuration
-    config = ConfigLoader(config_file="config.ini")
-    account_sid = config.get('twilio', 'TWILIO_ACCOUNT_SID')
-    auth_token = config.get('twilio', 'TWILIO_TOKEN')
-    from_number = config.get('twilio', 'TWILIO_PHONE_NO')
-    
-    # Use the ngrok URL from config for external calls
-    websocket_url = config.get('twilio', 'WEBSOCKET_URL')
+    # Load configuration (read once per process)
+    settings = load_twilio_settings()
+    from_number = settings.from_number
+    websocket_url = settings.websocket_url
+    client = settings.client
     
     # Log configuration (without secrets)
     logger.info(f"Using Twilio phone: {from_number}")
@@ -43,10 +56,6 @@ def make_demo_call(phone_number=None):
         phone_number = "+919998391508"  # Hardcoded phone number
         logger.info(f"Using hardcoded phone number: {phone_number}")
     
-    # Initialize Twilio client
-    logger.info(f"Initializing Twilio client with SID: {account_sid[:5]}...")
-    client = Client(account_sid, auth_token)
-    
     try:
         # Check if server is running
         try:
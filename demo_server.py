@@ -22,6 +22,7 @@ from services.Deepgram_service import DeepgramService
 from services.Elevenlabs import ElevenLabsService
 from services.LLM_agent import LanguageModelProcessor
 from config.config_loader import ConfigLoader
+from utils.event_loop import install_uvloop
 from logger.logger_config import logger
 
 class DemoServer:
@@ -36,7 +37,7 @@ class DemoServer:
         self.config_loader = ConfigLoader(config_file="config.ini")
         
         # Initialize shared data (without SQS polling)
-        self.shared_data = {"call_instance_list": []}
+        self.shared_data = {"call_instance_list": [], "call_instance_by_message_id": {}}
         self.call_status_mapping = {
             "canceled": 0,
             "completed": 1,
@@ -47,7 +48,7 @@ class DemoServer:
             "ringing": 6,
             "in-progress": 7
         }
-        self.queue_messages = {"message_list": []}
+        self.queue_messages = {"message_list": [], "message_ids": set(), "receipt_handles": {}}
         
         # Initialize services
         self.elevenlabs_service = ElevenLabsService(self.config_loader)
@@ -119,18 +120,18 @@ class DemoServer:
         try:
             # Initialize Memory A with questions
             await self.memory_a.initialize_with_questions("questions.json")
-            
-            # Pre-warm the LLM to reduce cold start latency
-            await self.conversation_manager.warm_up_llm()
-            
-            # Pre-generate audio for all questions
-            await self.memory_a.pre_generate_audio(self.elevenlabs_service)
 
             # Initialize Memory C with default fillers
             await self.memory_c.initialize_with_fillers()
-
-            # Pre-generate audio for all fillers
-            await self.memory_c.pre_generate_audio(self.elevenlabs_service)
+            
+            # The remaining warmups are independent network round trips, so run them together:
+            # pre-warm the LLM, open Deepgram sockets, and pre-generate question and filler audio
+            await asyncio.gather(
+                self.conversation_manager.warm_up_llm(),
+                self.deepgram_service.prewarm(),
+                self.memory_a.pre_generate_audio(self.elevenlabs_service),
+                self.memory_c.pre_generate_audio(self.elevenlabs_service)
+            )
             
             # Create application
             self.app = web.Application()
@@ -166,6 +167,9 @@ class DemoServer:
             import traceback
             self.logger.error(traceback.format_exc())
             raise
+        finally:
+            await self.elevenlabs_service.close()
+            await self.deepgram_service.close()
         
 async def main():
     """Main entry point"""
@@ -173,4 +177,5 @@ async def main():
     await server.start()
 
 if __name__ == "__main__":
+    install_uvloop()
     asyncio.run(main())
@@ -3,8 +3,8 @@ Conversation Manager
 Responsible for managing the conversation flow and state transitions
 """
 
+import orjson
 import asyncio
-import json
 import logging
 import re
 from typing import Dict, Any, Optional, List, Tuple
@@ -64,7 +64,8 @@ IMPORTANT:
    - The user's response requires a follow-up question based on the follow-up instructions
    - The user hasn't already provided the information that would be asked in the follow-up
 2. Return ONLY valid JSON. Do not include any explanations, notes, or text outside the JSON structure."""
-            self.llm_service.process(warm_up_prompt)
+            # Run the blocking client call in a worker thread so other warmups can overlap it
+            await asyncio.to_thread(self.llm_service.process, warm_up_prompt)
             self.logger.info("LLM pre-warmed successfully")
             return True
         except Exception as e:
@@ -82,7 +83,7 @@ IMPORTANT:
         """
         try:
             # Initialize conversation state in Memory B
-            await self.memory_b.initialize_conversation(call_sid, initial_state=0)
+            self.memory_b.initialize_conversation(call_sid, initial_state=0)
             
             # Get greeting message from Memory A
             greeting_msg = "Hello, this is an AI screening call. Please say something to start the call."
@@ -108,7 +109,7 @@ IMPORTANT:
         """
         try:
             # Get current state
-            current_state = await self.memory_b.get_state(call_sid)
+            current_state = self.memory_b.get_state(call_sid)
             if current_state is None:
                 return False, None, "No active conversation found"
                 
@@ -119,7 +120,7 @@ IMPORTANT:
             question_data = self.memory_a.get_question_data(next_state)
             if not question_data:
                 # No more questions, end the call
-                await self.memory_b.clear_conversation(call_sid)
+                self.memory_b.clear_conversation(call_sid)
                 end_message = "Thank you for your time. We have recorded all of your answers.. The interview is now complete. Goodbye."
                 
                 # For the end message, we'll return the text instead of generating audio
@@ -127,10 +128,10 @@ IMPORTANT:
                 return True, end_message, None
             
             # Update state in Memory B
-            await self.memory_b.update_state(call_sid, state_index=next_state)
+            self.memory_b.update_state(call_sid, state_index=next_state)
             
             # Reset follow-up tracking when advancing to a new state
-            await self.memory_b.update_state(
+            self.memory_b.update_state(
                 call_sid,
                 followup_attempts=0,
                 followup_qa_pairs=[]
@@ -143,7 +144,7 @@ IMPORTANT:
             response_categories = question_data.get("response_categories", {})
             
             # Store additional question metadata in Memory B
-            await self.memory_b.set_question_data(
+            self.memory_b.set_question_data(
                 call_sid, 
                 question_text, 
                 expected_output_type,
@@ -152,14 +153,12 @@ IMPORTANT:
             )
             
             # Get audio for the next question from Memory A
-            # Wait until audio is ready
-            audio_ready = self.memory_a.is_audio_ready(next_state)
-            while not audio_ready:
+            # Wait until audio is ready; pre-generation signals as soon as it is stored
+            if not self.memory_a.is_audio_ready(next_state):
                 self.logger.info(f"Waiting for audio to be ready for state {next_state}")
-                await asyncio.sleep(0.5)
-                audio_ready = self.memory_a.is_audio_ready(next_state)
+                await self.memory_a.wait_for_question_audio(next_state)
                 
-            question_audio = await self.memory_a.get_question_audio(next_state)
+            question_audio = self.memory_a.get_question_audio(next_state)
             
             if not question_audio:
                 return False, None, f"No audio found for state {next_state}"
@@ -175,12 +174,18 @@ IMPORTANT:
         Process a user response for a given call and determine next action.
         Returns: (success, followup_question_text, error_message)
         """
+        # Responses for the same call are processed one at a time; other calls are not blocked
+        async with self.memory_b.lock(call_sid):
+            return await self._process_response(call_sid, response_text)
+            
+    async def _process_response(self, call_sid: str, response_text: str) -> Tuple[bool, Optional[str], Optional[str]]:
+        """Process a user response while holding the call's Memory B lock"""
         try:
             # Buffer the response in Memory B
-            await self.memory_b.buffer_response(call_sid, response_text)
+            self.memory_b.buffer_response(call_sid, response_text)
             
             # Get conversation state
-            conv_state = await self.memory_b.get_state(call_sid)
+            conv_state = self.memory_b.get_state(call_sid)
             if not conv_state:
                 return False, None, "No active conversation found"
             
@@ -208,12 +213,12 @@ IMPORTANT:
                 conv_state.followup_qa_pairs[last_qa_idx] = (last_question, response_text)
                 
                 # Store the response as the last response to ensure it's included in LLM processing
-                await self.memory_b.update_state(call_sid, last_response=response_text)
+                self.memory_b.update_state(call_sid, last_response=response_text)
                 
                 self.logger.info(f"Received response to follow-up question for {call_sid}. Processing with LLM.")
             else:
                 # If this is the first response to the main question, store it as the last response
-                await self.memory_b.update_state(call_sid, last_response=response_text)
+                self.memory_b.update_state(call_sid, last_response=response_text)
             
             # Get question data
             question_data = self.memory_a.get_question_data(conv_state.state_index)
@@ -283,7 +288,7 @@ IMPORTANT:
             
             # Process with LLM
             self.logger.info(f"LLM CALL: Processing response for state {conv_state.state_index}, question: '{conv_state.original_question}'")
-            llm_response = self.llm_service.process(prompt)
+            llm_response = self.llm_service.process(prompt, cacheable=True)
             self.logger.info(f"LLM RESPONSE: {llm_response[:100]}...")
             
             # Extract JSON from response
@@ -296,8 +301,8 @@ IMPORTANT:
             else:
                 try:
                     json_str = llm_response[json_start:json_end]
-                    analysis = json.loads(json_str)
-                except json.JSONDecodeError as e:
+                    analysis = orjson.loads(json_str)
+                except orjson.JSONDecodeError as e:
                     self.logger.error(f"Error parsing LLM response: {e}")
                     analysis = {"response_type": "default", "needs_followup": False}
             
@@ -307,11 +312,11 @@ IMPORTANT:
             needs_followup = analysis.get("needs_followup", False)
             
             # Store response type and extracted values in Memory B
-            await self.memory_b.set_response_type(call_sid, response_type)
+            self.memory_b.set_response_type(call_sid, response_type)
             
             # Store extracted value if present
             if extracted_value is not None:
-                await self.memory_b.set_extracted_value(call_sid, "extracted_value", str(extracted_value))
+                self.memory_b.set_extracted_value(call_sid, "extracted_value", str(extracted_value))
             
             # Check if there's a follow-up instruction for this response type
             follow_up_instructions = question_data.get("follow_up_instructions", {})
@@ -329,20 +334,20 @@ IMPORTANT:
                 self.logger.info(f"Generated follow-up question for {call_sid}: {formatted_follow_up}")
                 
                 # Add this follow-up to the conversation state
-                await self.memory_b.add_followup_qa(call_sid, formatted_follow_up, "")
+                self.memory_b.add_followup_qa(call_sid, formatted_follow_up, "")
                 
                 # Return the follow-up question to be asked
                 return False, formatted_follow_up, None
             
             # Check if we should advance to next state based on response type
-            if await self.memory_b.should_advance_state(call_sid):
+            if self.memory_b.should_advance_state(call_sid):
                 self.logger.info(f"Advancing state based on response type: {response_type}")
                 return True, None, None
 
             self.logger.info(f"DEBUG - needs_followup value: {needs_followup}")
             
             # Check if we can ask a follow-up question
-            if not await self.memory_b.can_ask_followup(call_sid) or not needs_followup:
+            if not self.memory_b.can_ask_followup(call_sid) or not needs_followup:
                 # Max follow-up attempts reached or no follow-up needed, advance to next state
                 self.logger.info(f"No follow-up needed or max attempts reached for call_sid: {call_sid}. Advancing state.")
                 return True, None, None
@@ -376,7 +381,7 @@ IMPORTANT:
                 followup_question = await self._generate_followup_question_with_llm(call_sid)
             
             # Store the follow-up question (answer will be added later when user responds)
-            await self.memory_b.add_followup_qa(call_sid, followup_question, "")
+            self.memory_b.add_followup_qa(call_sid, followup_question, "")
             
             # Return the follow-up question text instead of audio
             return False, followup_question, None
@@ -391,7 +396,7 @@ IMPORTANT:
         """
         try:
             # Get all conversation data needed for LLM
-            conversation_data = await self.memory_b.get_conversation_data(call_sid)
+            conversation_data = self.memory_b.get_conversation_data(call_sid)
             
             # Prepare prompt for LLM
             original_question = conversation_data.get("original_question", "")
@@ -425,7 +430,7 @@ IMPORTANT:
             """
             
             # Call LLM service
-            followup_question = self.llm_service.process(prompt)
+            followup_question = self.llm_service.process(prompt, cacheable=True)
             
             # Clean up the response if needed
             followup_question = followup_question.strip()
@@ -442,14 +447,14 @@ IMPORTANT:
         Returns the audio for the first question
         """
         # Advance to state 1
-        await self.memory_b.update_state(call_sid, state_index=1, attempts=0)
+        self.memory_b.update_state(call_sid, state_index=1, attempts=0)
         
         # Get question data for state 1
         question_data = self.memory_a.get_question_data(1)
         
         if question_data:
             # Update conversation state with expected output type and patterns
-            await self.memory_b.update_state(
+            self.memory_b.update_state(
                 call_sid,
                 expected_output_type=question_data.get('expected_answer_type', ''),
                 max_followup_attempts=question_data.get('max_followups', 2)
@@ -460,7 +465,7 @@ IMPORTANT:
             expected_output_type = question_data.get("expected_answer_type", "")
             response_categories = question_data.get("response_categories", {})
             
-            await self.memory_b.set_question_data(
+            self.memory_b.set_question_data(
                 call_sid, 
                 question_text, 
                 expected_output_type,
@@ -469,18 +474,18 @@ IMPORTANT:
             )
             
         # Retrieve pre-generated audio for state 1
-        audio_data = await self.memory_a.get_question_audio(1)
+        audio_data = self.memory_a.get_question_audio(1)
         
         if not audio_data and question_data:
             # If audio isn't pre-generated yet, generate it now
             question_text = question_data.get('question', '')
             audio_data = await self.elevenlabs_service.text_to_speech_full(question_text)
-            await self.memory_a.store_question_audio(1, audio_data)
+            self.memory_a.store_question_audio(1, audio_data)
             
         self.logger.info(f"Started conversation for call {call_sid}, transitioned to state 1")
         return audio_data
         
     async def end_conversation(self, call_sid: str) -> None:
         """End the conversation and clean up resources"""
-        await self.memory_b.clear_conversation(call_sid)
+        self.memory_b.clear_conversation(call_sid)
         self.logger.info(f"Ended conversation for call {call_sid}")
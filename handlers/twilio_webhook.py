@@ -57,7 +57,7 @@ async def handle_call_initiated(call_sid, request_data, memory_a, memory_b, shar
     """Handle webhook for call initiation"""
     try:
         # Initialize conversation state in Memory B
-        await memory_b.initialize_conversation(call_sid, initial_state=0)
+        memory_b.initialize_conversation(call_sid, initial_state=0)
         
         # Generate TwiML response to connect to websocket for streaming
         from_number = request_data.get('From', 'unknown')
@@ -111,7 +111,7 @@ async def handle_call_ended(call_sid, request_data, memory_a, memory_b, shared_d
     """Handle webhook for call completion"""
     try:
         # Clean up resources for this call
-        await memory_b.end_conversation(call_sid)
+        memory_b.end_conversation(call_sid)
         
         # Log call details for analytics
         call_duration = request_data.get('CallDuration', '0')
@@ -127,6 +127,9 @@ async def handle_call_ended(call_sid, request_data, memory_a, memory_b, shared_d
                     call for call in shared_data["call_instance_list"] 
                     if call.get("call_sid") != call_sid
                 ]
+                by_message_id = shared_data.get("call_instance_by_message_id", {})
+                for message_id in [mid for mid, call in by_message_id.items() if call.get("call_sid") == call_sid]:
+                    del by_message_id[message_id]
                 logger.info(f"Removed call {call_sid} from outbound call tracking")
         
         # If desired, you could save call data to a database here
@@ -1,13 +1,13 @@
 import logging
-import json
-import base64
+import orjson
+import binascii
 import asyncio
 import uuid
 import time
 import random
 
 from typing import Dict, Any, Optional
-import random
+from dataclasses import dataclass, field
 
 from memory.memory_a import MemoryA
 from memory.memory_b import MemoryB
@@ -15,6 +15,57 @@ from memory.memory_c import MemoryC
 from handlers.conversation_manager import ConversationManager
 from services.Deepgram_service import DeepgramService
 from services.audio_streaming_service import AudioStreamingService
+from utils.streaming import MEDIA_SUFFIX, buffered, build_media_prefix, encode_payload
+
+
+# Deepgram treats binary frames as audio, so the close message stays a text frame
+DEEPGRAM_CLOSE_STREAM = '{"type": "CloseStream"}'
+
+
+@dataclass(slots=True)
+class ConnectionState:
+    """Class for tracking the state of a single Twilio WebSocket connection"""
+    websocket: Any = None
+    stream_sid: Optional[str] = None
+    call_sid: Optional[str] = None
+    exit_event: asyncio.Event = field(default_factory=asyncio.Event)
+    speaking_flag: asyncio.Event = field(default_factory=asyncio.Event)
+    listening_flag: asyncio.Event = field(default_factory=asyncio.Event)
+    
+    # Deepgram connection
+    deepgram_connection: Any = None
+    deepgram_ready: asyncio.Event = field(default_factory=asyncio.Event)
+    
+    # Audio buffering
+    audio_buffer: bytearray = field(default_factory=bytearray)
+    outbox: asyncio.Queue = field(default_factory=asyncio.Queue)
+    
+    # Marks sent to Twilio and events set when they are played
+    marks: list = field(default_factory=list)
+    mark_events: Dict[str, asyncio.Event] = field(default_factory=dict)
+    
+    # Audio replay for interruptions
+    current_audio_buffer: Optional[bytes] = None
+    current_audio_text: str = ""
+    interruption_detected: bool = False
+    replay_count: int = 0
+    
+    # Accumulated text from transcription
+    accumulated_text: str = ""
+    
+    # Interaction time for silence detection
+    interaction_time: float = field(default_factory=time.time)
+    
+    # Whether the next followup is the first one for the current question
+    first_followup: bool = False
+    
+    # Prebuilt Twilio media envelope for this stream
+    media_prefix: str = field(default_factory=lambda: build_media_prefix(None))
+    
+    def set_stream_sid(self, stream_sid: Optional[str]) -> None:
+        """Store the stream SID and prebuild the media envelope around it"""
+        self.stream_sid = stream_sid
+        self.media_prefix = build_media_prefix(stream_sid)
 
 
 class WebSocketManager:
@@ -54,42 +105,18 @@ class WebSocketManager:
         self.audio_service = AudioStreamingService(memory_c=memory_c, logger=self.logger)
         
         # Outbound call tracking
-        self.shared_data = shared_data or {"call_instance_list": []}
+        self.shared_data = shared_data or {"call_instance_list": [], "call_instance_by_message_id": {}}
         self.call_status_mapping = call_status_mapping or {}
-        self.queue_messages = queue_messages or {"message_list": []}
+        self.queue_messages = queue_messages or {"message_list": [], "message_ids": set(), "receipt_handles": {}}
         
         # Client-specific data
-        self.active_connections = {}
-        self.stream_sids = {}
-        self.call_sids = {}
-        self.marks = {}
-        self.speaking_flags = {}
-        self.exit_events = {}
-        self.listening_flags = {}
+        self.connections: Dict[str, ConnectionState] = {}  # ws_id -> ConnectionState
         
         # Audio buffering
         self.BUFFER_SIZE = 10 * 160  # Same as used in old implementation
-        self.audio_buffers = {}
-        self.outboxes = {}
-        
-        # Audio replay for interruptions
-        self.current_audio_buffer = {}
-        self.current_audio_text = {}
-        self.interruption_detected = {}
-        self.replay_counts = {}  # Track number of replays per session
-        
-        # Track first followup questions
-        self.first_followup_flags = {}  # Track if this is the first followup for a question
-        
-        # Deepgram connections
-        self.deepgram_connections = {}
-        self.deepgram_ready_events = {}
         
-        # Accumulated text from transcription
-        self.accumulated_texts = {}
-        
-        # Track interaction times for silence detection
-        self.interaction_times = {}
+        # Strong references to fire-and-forget tasks (the event loop only keeps weak ones)
+        self.background_tasks = set()
         
         self.logger.info("WebSocketManager initialized")
     
@@ -102,91 +129,73 @@ class WebSocketManager:
             self.logger.info(f"Starting WebSocket handler for {ws_id}")
             
             # Initialize connection tracking
-            self.active_connections[ws_id] = client_ws
-            self.exit_events[ws_id] = asyncio.Event()
-            self.speaking_flags[ws_id] = asyncio.Event()
-            self.listening_flags[ws_id] = asyncio.Event()
-            self.listening_flags[ws_id].clear()
-            self.accumulated_texts[ws_id] = ""
-            self.audio_buffers[ws_id] = bytearray()
-            self.outboxes[ws_id] = asyncio.Queue()
-            self.marks[ws_id] = []
-            
-            # Initialize interruption tracking
-            self.interruption_detected[ws_id] = False
-            self.replay_counts[ws_id] = 0
-            self.current_audio_buffer[ws_id] = None
-            self.current_audio_text[ws_id] = ""
-            
-            # Initialize interaction time
-            self.interaction_times[ws_id] = time.time()  # Initialize interaction time
+            conn = self.connections[ws_id] = ConnectionState(websocket=client_ws)
             
             # Initialize stream_sid and call_sid
             stream_sid = None
             call_sid = None
             
             # Initialize Deepgram connection
-            self.deepgram_ready_events[ws_id] = asyncio.Event()
             await self.connect_to_deepgram(ws_id)
             
             # Start the Deepgram receiver task
-            deepgram_task = asyncio.create_task(self._handle_deepgram_receiving(ws_id))
+            deepgram_task = self._spawn(self._handle_deepgram_receiving(ws_id))
             
             # Start heartbeat task
-            heartbeat_task = asyncio.create_task(self._heartbeat(ws_id))
+            heartbeat_task = self._spawn(self._heartbeat(ws_id))
             
             # Process incoming messages
             async for message in client_ws:
-                if self.exit_events[ws_id].is_set():
+                if conn.exit_event.is_set():
                     self.logger.info(f"Exit signal received for {ws_id}")
                     break
                     
-                data = json.loads(message)
+                data = orjson.loads(message)
                 
                 # Only log non-media messages at INFO level to reduce noise
                 if data.get('event') != 'media':
                     self.logger.info(f"Received WebSocket message for {ws_id}: {message[:100]}...")
-                elif random.random() < 0.02:  # ~2% chance to log media messages at DEBUG level
+                elif self.logger.isEnabledFor(logging.DEBUG) and random.random() < 0.02:  # ~2% chance to log media messages at DEBUG level
                     self.logger.debug(f"Received WebSocket message for {ws_id}: {message[:100]}...")
                 
                 if data["event"] == "connected":
                     # Store the stream SID for later use
                     stream_sid = data.get("streamSid")
                     self.logger.info(f"Connected event data: {data}")
-                    self.stream_sids[ws_id] = stream_sid
+                    conn.set_stream_sid(stream_sid)
                     self.logger.info(f"Connected to stream {stream_sid} for {ws_id}")
                     
                     # Get call SID from parameters
                     if 'start' in data and 'callSid' in data['start']:
                         call_sid = data['start']['callSid']
-                        self.call_sids[ws_id] = call_sid
+                        conn.call_sid = call_sid
                         self.logger.info(f"Call SID: {call_sid} for {ws_id}")
                         
                         # Initialize conversation in Memory B
-                        await self.memory_b.initialize_conversation(call_sid)
+                        self.memory_b.initialize_conversation(call_sid)
                         
                         # Initialize first followup flag for this call
-                        self.first_followup_flags[call_sid] = True
+                        conn.first_followup = True
                         self.logger.info(f"Initialized first followup flag for call {call_sid}")
                     
                 elif data.get('event') == 'start':
                     # Extract call SID if not already set
                     if not call_sid and 'callSid' in data['start']:
                         call_sid = data['start']['callSid']
-                        self.call_sids[ws_id] = call_sid
+                        conn.call_sid = call_sid
                         self.logger.info(f"Call SID from start event: {call_sid} for {ws_id}")
                         
                         # Initialize conversation in Memory B
-                        await self.memory_b.initialize_conversation(call_sid)
+                        self.memory_b.initialize_conversation(call_sid)
                         
                         # Initialize first followup flag for this call
-                        self.first_followup_flags[call_sid] = True
+                        conn.first_followup = True
                         self.logger.info(f"Initialized first followup flag for call {call_sid}")
                     
                     # Extract stream SID if present in the start event
                     if 'streamSid' in data['start']:
                         stream_sid = data['start']['streamSid']
-                        self.stream_sids[ws_id] = stream_sid
+                        conn.set_stream_sid(stream_sid)
                         self.logger.info(f"Stream SID from start event: {stream_sid} for {ws_id}")
                     
                     # Log the full start event data for debugging
@@ -199,42 +208,42 @@ class WebSocketManager:
                     audio_buffer = await self.audio_service.stream_elevenlabs_audio(
                         ws_id=ws_id,
                         text=greeting_text,
-                        active_connections=self.active_connections,
-                        stream_sids=self.stream_sids,
+                        client_ws=conn.websocket,
+                        stream_sid=conn.stream_sid,
                         elevenlabs_service=self.conversation_manager.elevenlabs_service,
                         collect_audio=True
                     )
                     # Store the audio buffer and text for potential replay
-                    self.current_audio_buffer[ws_id] = audio_buffer
-                    self.current_audio_text[ws_id] = greeting_text
+                    conn.current_audio_buffer = audio_buffer
+                    conn.current_audio_text = greeting_text
                     # Reset replay counter for new audio
-                    self.replay_counts[ws_id] = 0
+                    conn.replay_count = 0
                     await self._send_mark(ws_id)
-                    self.speaking_flags[ws_id].set()
+                    conn.speaking_flag.set()
                     self.logger.info(f"Greeting played, waiting for user response for {ws_id}")
                 
                 elif data.get('event') == 'media':
                     # logging media messages occasionally (1 in 50) to reduce noise
-                    if random.random() < 0.02:  
+                    if self.logger.isEnabledFor(logging.DEBUG) and random.random() < 0.02:  
                         self.logger.debug(f"Received media message for {ws_id}")
                     
                     # Process incoming audio
                     if 'media' in data and 'payload' in data['media']:
                         # Decode base64 audio
-                        audio_data = base64.b64decode(data['media']['payload'])
+                        audio_data = binascii.a2b_base64(data['media']['payload'])
                         
                         # Add to buffer
-                        self.audio_buffers[ws_id].extend(audio_data)
+                        conn.audio_buffer.extend(audio_data)
                         
                         # If buffer is full, send to Deepgram
-                        if len(self.audio_buffers[ws_id]) >= self.BUFFER_SIZE:
+                        if len(conn.audio_buffer) >= self.BUFFER_SIZE:
                             # Only send if Deepgram is ready
-                            if self.deepgram_ready_events[ws_id].is_set() and ws_id in self.deepgram_connections:
+                            if conn.deepgram_ready.is_set() and conn.deepgram_connection:
                                 try:
-                                    # Send audio to Deepgram
-                                    await self.deepgram_connections[ws_id].send(bytes(self.audio_buffers[ws_id]))
-                                    # Clear buffer
-                                    self.audio_buffers[ws_id] = bytearray()
+                                    # Send audio to Deepgram (websockets sends a bytearray as a binary frame, no copy needed)
+                                    await asyncio.wait_for(conn.deepgram_connection.send(conn.audio_buffer), timeout=5.0)
+                                    # Start a fresh buffer rather than clearing the one just sent
+                                    conn.audio_buffer = bytearray()
                                 except Exception as e:
                                     self.logger.error(f"Error sending audio to Deepgram: {e}")
                 
@@ -242,27 +251,31 @@ class WebSocketManager:
                     # Handle mark event (when AI finishes speaking)
                     if 'mark' in data and 'name' in data['mark']:
                         mark_name = data['mark']['name']
-                        if mark_name in self.marks[ws_id]:
+                        if mark_name in conn.marks:
                             self.logger.info(f"Mark received: {mark_name} for {ws_id}")
+                            # Wake up anything waiting for this audio to finish playing
+                            mark_event = conn.mark_events.pop(mark_name, None)
+                            if mark_event:
+                                mark_event.set()
                             # Clear speaking flag to allow processing user input
-                            self.speaking_flags[ws_id].clear()
+                            conn.speaking_flag.clear()
                             # Activate listening mode
-                            self.listening_flags[ws_id].set()
+                            conn.listening_flag.set()
                             self.logger.info(f"Listening mode activated for {ws_id}")
                             # Reset interruption flag if it was set
-                            if ws_id in self.interruption_detected and self.interruption_detected[ws_id]:
+                            if conn.interruption_detected:
                                 self.logger.info(f"Resetting interruption flag for {ws_id}")
-                                self.interruption_detected[ws_id] = False
+                                conn.interruption_detected = False
                             # Special handling for end call mark
                             if mark_name == "end call":
                                 self.logger.info(f"End call mark received for {ws_id}")
                                 # Set exit event to clean up resources
-                                self.exit_events[ws_id].set()
+                                conn.exit_event.set()
                                 
                 elif data.get('event') == 'closed':
                     # Handle connection closed event
                     self.logger.info(f"Connection closed for {ws_id}")
-                    self.exit_events[ws_id].set()
+                    conn.exit_event.set()
                     break
                     
             self.logger.info(f"WebSocket connection closed for {ws_id}")
@@ -279,8 +292,8 @@ class WebSocketManager:
     
     async def _handle_client_messages(self, ws_id):
         """Process messages from Twilio WebSocket"""
-        client_ws = self.active_connections.get(ws_id)
-        if not client_ws:
+        conn = self.connections.get(ws_id)
+        if not conn or not conn.websocket:
             return
             
         empty_byte_received = False
@@ -288,37 +301,36 @@ class WebSocketManager:
         self.logger.info(f"Started handling client messages for {ws_id}")
         
         try:
-            async for message in client_ws:
-                if self.exit_events[ws_id].is_set():
+            async for message in conn.websocket:
+                if conn.exit_event.is_set():
                     self.logger.info(f"Exit signal received for {ws_id}")
                     break
                     
-                data = json.loads(message)
+                data = orjson.loads(message)
                 
                 
                 if data.get('event') != 'media':
                     self.logger.info(f"Received WebSocket message for {ws_id}: {message[:100]}...")
-                elif random.random() < 0.02:  
+                elif self.logger.isEnabledFor(logging.DEBUG) and random.random() < 0.02:  
                     self.logger.debug(f"Received WebSocket message for {ws_id}: {message[:100]}...")
                 
                 if data["event"] == "connected":
                     # Initialize Deepgram connection
                     self.logger.info(f"Connecting to Deepgram for {ws_id}")
-                    self.deepgram_connections[ws_id] = await self.deepgram_service.connect()
-                    self.deepgram_ready_events[ws_id] = asyncio.Event()
-                    self.deepgram_ready_events[ws_id].set()
+                    conn.deepgram_connection = await self.deepgram_service.connect()
+                    conn.deepgram_ready.set()
                     self.logger.info(f"Deepgram connected for {ws_id}")
                 
                 elif data["event"] == "start":
                     # Store stream and call IDs
-                    self.stream_sids[ws_id] = data["streamSid"]
-                    self.call_sids[ws_id] = data["start"]["callSid"]
-                    self.logger.info(f"Call started with SID: {self.call_sids[ws_id]} for {ws_id}")
+                    conn.set_stream_sid(data["streamSid"])
+                    conn.call_sid = data["start"]["callSid"]
+                    self.logger.info(f"Call started with SID: {conn.call_sid} for {ws_id}")
                     
                     # Initialize call in conversation manager
                     self.logger.info(f"Initializing call in conversation manager for {ws_id}")
                     success, greeting_text, error = await self.conversation_manager.initialize_call(
-                        self.call_sids[ws_id]
+                        conn.call_sid
                     )
                     
                     if success and greeting_text:
@@ -326,20 +338,20 @@ class WebSocketManager:
                         # Stream greeting audio directly from ElevenLabs to Twilio
                         await self._stream_elevenlabs_audio(ws_id, greeting_text)
                         await self._send_mark(ws_id)
-                        self.speaking_flags[ws_id].set()
+                        conn.speaking_flag.set()
                         self.logger.info(f"Greeting played, waiting for user response for {ws_id}")
                     else:
                         self.logger.error(f"Failed to initialize call: {error} for {ws_id}")
                     
                 elif data["event"] == "media":
                     media = data["media"]
-                    chunk = base64.b64decode(media["payload"])
+                    chunk = binascii.a2b_base64(media["payload"])
                     
                     if chunk:
                         # logging media messages occasionally (1 in 50) to reduce noise
-                        if random.random() < 0.02: 
+                        if self.logger.isEnabledFor(logging.DEBUG) and random.random() < 0.02: 
                             self.logger.debug(f"Received media chunk: {len(chunk)} bytes for {ws_id}")
-                        self.audio_buffers[ws_id].extend(chunk)
+                        conn.audio_buffer.extend(chunk)
                         if chunk == b'':
                             empty_byte_received = True
                 
@@ -349,44 +361,45 @@ class WebSocketManager:
                     self.logger.info(f"Mark {label} (sequence: {sequence_number}) played for {ws_id}")
                     
                     # Remove the mark from our tracking list
-                    if label in self.marks[ws_id]:
-                        self.marks[ws_id].remove(label)
+                    if label in conn.marks:
+                        conn.marks.remove(label)
                     
                     # If all marks are processed and we're flagged as speaking, clear the flag
-                    if not self.marks[ws_id] and self.speaking_flags[ws_id].is_set():
-                        self.speaking_flags[ws_id].clear()
-                        self.accumulated_texts[ws_id] = ""
+                    if not conn.marks and conn.speaking_flag.is_set():
+                        conn.speaking_flag.clear()
+                        conn.accumulated_text = ""
                         
                         # Reset interruption flag if it was set
-                        if ws_id in self.interruption_detected and self.interruption_detected[ws_id]:
+                        if conn.interruption_detected:
                             self.logger.info(f"Resetting interruption flag for {ws_id}")
-                            self.interruption_detected[ws_id] = False
+                            conn.interruption_detected = False
                             
                         self.logger.info(f"AI finished speaking for {ws_id}, ready to listen")
                     
                     # Handle end call mark
                     if label == "end call":
                         self.logger.info(f"Ending call for {ws_id}")
-                        self.exit_events[ws_id].set()
+                        conn.exit_event.set()
                         # Close Deepgram connection
-                        if ws_id in self.deepgram_connections and self.deepgram_connections[ws_id]:
-                            self.deepgram_connections[ws_id].send(json.dumps({"type": "CloseStream"}))
+                        if conn.deepgram_connection:
+                            await conn.deepgram_connection.send(DEEPGRAM_CLOSE_STREAM)
                         break
                 
                 elif data["event"] == "stop":
                     self.logger.info(f"Received stop event for {ws_id}")
-                    if not self.exit_events[ws_id].is_set():
-                        self.exit_events[ws_id].set()
+                    if not conn.exit_event.is_set():
+                        conn.exit_event.set()
                     break
                 
                 else:
                     self.logger.info(f"Unhandled event type: {data['event']} for {ws_id}")
                 
                 # Check if we have enough audio to send to Deepgram
-                if len(self.audio_buffers[ws_id]) >= self.BUFFER_SIZE or empty_byte_received:
+                if len(conn.audio_buffer) >= self.BUFFER_SIZE or empty_byte_received:
                     self.logger.info(f"Sending audio buffer to Deepgram for {ws_id}")
-                    await self.outboxes[ws_id].put(bytes(self.audio_buffers[ws_id]))
-                    self.audio_buffers[ws_id] = bytearray()
+                    # Hand the filled buffer over to the sender instead of copying it
+                    await conn.outbox.put(conn.audio_buffer)
+                    conn.audio_buffer = bytearray()
         except Exception as e:
             self.logger.error(f"Error in _handle_client_messages for {ws_id}: {e}")
             import traceback
@@ -396,35 +409,40 @@ class WebSocketManager:
     
     async def _handle_deepgram_sending(self, ws_id):
         """Send buffered audio to Deepgram"""
-        if ws_id not in self.deepgram_ready_events:
+        conn = self.connections.get(ws_id)
+        if not conn:
             return
             
-        await self.deepgram_ready_events[ws_id].wait()
+        await conn.deepgram_ready.wait()
         self.logger.info(f"Deepgram sender started for {ws_id}")
         
-        while not self.exit_events[ws_id].is_set():
+        while not conn.exit_event.is_set():
             try:
-                chunk = await self.outboxes[ws_id].get()
-                if ws_id in self.deepgram_connections and self.deepgram_connections[ws_id]:
-                    await self.deepgram_connections[ws_id].send(chunk)
+                # Wake up periodically so a closed connection is noticed
+                chunk = await asyncio.wait_for(conn.outbox.get(), timeout=1.0)
+                if conn.deepgram_connection:
+                    await asyncio.wait_for(conn.deepgram_connection.send(chunk), timeout=5.0)
+            except asyncio.TimeoutError:
+                continue
             except Exception as e:
                 self.logger.error(f"Error sending to Deepgram for {ws_id}: {e}")
-                if self.exit_events[ws_id].is_set():
+                if conn.exit_event.is_set():
                     break
     
     async def _handle_deepgram_receiving(self, ws_id):
         """Process transcriptions from Deepgram"""
-        if ws_id not in self.deepgram_ready_events:
+        conn = self.connections.get(ws_id)
+        if not conn:
             self.logger.warning(f"Deepgram not initialized for {ws_id}")
             return
             
-        await self.deepgram_ready_events[ws_id].wait()
+        await conn.deepgram_ready.wait()
         self.logger.info(f"Deepgram receiver started for {ws_id}")
         
         interaction_time = time.time()
         last_log_time = time.time()
         
-        while not self.exit_events[ws_id].is_set():
+        while not conn.exit_event.is_set():
             try:
                 # Logging heartbeat every 10 seconds to show the method is still running
                 current_time = time.time()
@@ -432,7 +450,7 @@ class WebSocketManager:
                     self.logger.info(f"Deepgram receiver heartbeat for {ws_id}")
                     last_log_time = current_time
                 
-                if not self.deepgram_ready_events[ws_id].is_set():
+                if not conn.deepgram_ready.is_set():
                     self.logger.warning(f"Deepgram connection not ready for {ws_id}")
                     await asyncio.sleep(0.1)
                     continue
@@ -449,7 +467,7 @@ class WebSocketManager:
                 # If we got a transcription
                 if message_json:
                     # Only process transcriptions when in listening mode
-                    if not self.listening_flags[ws_id].is_set():
+                    if not conn.listening_flag.is_set():
                         # Logging transcriptions received when not listening (for debugging)
                         if random.random() < 0.1:  
                             if "channel" in message_json and "alternatives" in message_json["channel"] and message_json["channel"]["alternatives"]:
@@ -462,21 +480,21 @@ class WebSocketManager:
                         transcript = message_json["channel"]["alternatives"][0]["transcript"].strip()
                         if transcript:
                             
-                            if self.accumulated_texts[ws_id].strip():
-                                self.accumulated_texts[ws_id] += " " + transcript
+                            if conn.accumulated_text:
+                                conn.accumulated_text += " " + transcript
                             else:
-                                self.accumulated_texts[ws_id] = transcript
-                            self.logger.info(f"Final transcript for {ws_id}: {self.accumulated_texts[ws_id]}")
+                                conn.accumulated_text = transcript
+                            self.logger.info(f"Final transcript for {ws_id}: {conn.accumulated_text}")
                     elif message_json.get("is_final"):
                        
                         transcript = message_json["channel"]["alternatives"][0]["transcript"].strip()
                         if transcript:
                             # Add space only if accumulated text is not empty
-                            if self.accumulated_texts[ws_id].strip():
-                                self.accumulated_texts[ws_id] += " " + transcript
+                            if conn.accumulated_text:
+                                conn.accumulated_text += " " + transcript
                             else:
-                                self.accumulated_texts[ws_id] = transcript
-                            self.logger.info(f"Interim final transcript for {ws_id}: {self.accumulated_texts[ws_id]}")
+                                conn.accumulated_text = transcript
+                            self.logger.info(f"Interim final transcript for {ws_id}: {conn.accumulated_text}")
                     else:
                         # Log interim results occasionally
                         if current_time - last_log_time > 5:
@@ -491,7 +509,7 @@ class WebSocketManager:
                     continue
                 
                 # Skip processing if AI is speaking
-                if self.speaking_flags[ws_id].is_set():
+                if conn.speaking_flag.is_set():
                     # Check if there's actual speech (interruption)
                     if message_json is not None:
                         self.logger.info(f"INTERRUPTION_DEBUG: Received message during AI speech for {ws_id}")
@@ -501,9 +519,9 @@ class WebSocketManager:
                             if interim_text:
                                 self.logger.info(f"INTERRUPTION_DEBUG: User interrupted AI speech: '{interim_text}' for {ws_id}")
                                 # Set interruption flag
-                                self.interruption_detected[ws_id] = True
+                                conn.interruption_detected = True
                                 # Clear accumulated text to prevent it from being sent to LLM
-                                self.accumulated_texts[ws_id] = ""
+                                conn.accumulated_text = ""
                                 # Replay the audio
                                 replay_result = await self._replay_audio(ws_id)
                                 self.logger.info(f"INTERRUPTION_DEBUG: Replay result: {replay_result} for {ws_id}")
@@ -517,19 +535,21 @@ class WebSocketManager:
                 
                 # Check for silence
                 elapsed_time = time.time() - interaction_time
-                silence_threshold = 1 if len(self.accumulated_texts[ws_id].split()) < 8 else 1.2
+                # accumulated_text only ever holds stripped fragments joined by single
+                # spaces, so counting spaces gives the word count without splitting
+                silence_threshold = 1 if conn.accumulated_text.count(" ") < 7 else 1.2
                 
                 # Process accumulated text after silence
-                if elapsed_time > silence_threshold and self.accumulated_texts[ws_id].strip():
-                    call_sid = self.call_sids.get(ws_id)
+                if elapsed_time > silence_threshold and conn.accumulated_text:
+                    call_sid = conn.call_sid
                     if not call_sid:
                         self.logger.warning(f"No call SID for {ws_id}, cannot process response")
                         continue
                         
-                    self.logger.info(f"Processing after {elapsed_time}s silence: {self.accumulated_texts[ws_id]}")
+                    self.logger.info(f"Processing after {elapsed_time}s silence: {conn.accumulated_text}")
                     
                     # Deactivate listening mode
-                    self.listening_flags[ws_id].clear()
+                    conn.listening_flag.clear()
                     self.logger.info(f"Listening mode deactivated for {ws_id}")
                     
                     # End timing - Deepgram processing
@@ -548,7 +568,7 @@ class WebSocketManager:
                     
                     state_change, followup_question, error = await self.conversation_manager.process_response(
                         call_sid, 
-                        self.accumulated_texts[ws_id].strip()
+                        conn.accumulated_text.strip()
                     )
                     
                     # End timing - LLM processing
@@ -562,7 +582,7 @@ class WebSocketManager:
                     # If we have a follow-up question to play
                     if followup_question:
                         # Check if this is the first followup for this question
-                        is_first_followup = self.first_followup_flags.get(call_sid, False)
+                        is_first_followup = conn.first_followup
                         
                         # Start timing - ElevenLabs processing
                         elevenlabs_start_time = time.time()
@@ -585,24 +605,30 @@ class WebSocketManager:
                             self.logger.info(f"Playing filler audio for first followup for call {call_sid}")
                             
                             # Start buffering ElevenLabs chunks in background
-                            chunk_queue = asyncio.Queue()
-                            buffer_task = asyncio.create_task(self._buffer_elevenlabs_chunks(followup_question, chunk_queue))
+                            audio_chunks = buffered(
+                                self.conversation_manager.elevenlabs_service.text_to_speech(followup_question),
+                                spawn=self._spawn,
+                                batch=True,
+                                timeout=15.0,
+                                # Allows for waiting on the ElevenLabs stream limit before the first chunk
+                                first_timeout=60.0
+                            )
                             
                             # Get the current state from memory_b
-                            conversation_state = await self.memory_b.get_state(call_sid)
+                            conversation_state = self.memory_b.get_state(call_sid)
                             current_state = conversation_state.state_index if conversation_state else None
                             
                             # Play appropriate filler audio
-                            await self.audio_service.play_filler_audio(ws_id, self.active_connections, self.stream_sids, current_state)
+                            await self.audio_service.play_filler_audio(ws_id, conn.websocket, conn.stream_sid, current_state)
                             
                             # Mark that we've used the first followup
-                            self.first_followup_flags[call_sid] = False
+                            conn.first_followup = False
                             self.logger.info(f"First followup flag set to False for call {call_sid}")
                             
                             # Start streaming chunks as they become available
                             self.logger.info(f"Filler complete, streaming ElevenLabs chunks for {ws_id}")
                             self.logger.info(f"Playing follow-up: {followup_question[:50]}... for {ws_id}")
-                            await self._stream_from_queue(ws_id, chunk_queue, followup_question)
+                            await self._stream_from_queue(ws_id, audio_chunks, followup_question)
                         else:
                             self.logger.info(f"Playing follow-up: {followup_question[:50]}... for {ws_id}")
                             # Stream audio directly from ElevenLabs to Twilio
@@ -621,22 +647,22 @@ class WebSocketManager:
                         total_latency = processing_latency + silence_detection_time
                         self.logger.info(f"LATENCY_TOTAL: From user stops speaking to AI speaking: {total_latency:.2f}s")
                         
-                        await self._send_mark(ws_id)
-                        self.speaking_flags[ws_id].set()
+                        final_mark = await self._send_mark(ws_id)
+                        conn.speaking_flag.set()
                         # Clear accumulated text after playing a follow-up question
-                        self.accumulated_texts[ws_id] = ""
+                        conn.accumulated_text = ""
                         
                         # Check if this is the final goodbye message
                         if followup_question and "thank you for your time" in followup_question.lower() and "goodbye" in followup_question.lower():
                             self.logger.info(f"Final message detected for {ws_id}, will close connection after audio completes")
                             # Set a flag to close the connection after the final message
-                            asyncio.create_task(self._close_after_final_message(ws_id))
+                            self._spawn(self._close_after_final_message(ws_id, final_mark))
                     # If we need to change state
                     if state_change:
                         self.logger.info(f"\nState change detected for {ws_id}, advancing state\n-------------------------------------------------\n")
                         
                         # Clear transcript buffer to prevent answers from bleeding into next question
-                        self.accumulated_texts[ws_id] = ""
+                        conn.accumulated_text = ""
                         
                         # Start timing - State advancement
                         state_change_start_time = time.time()
@@ -654,10 +680,10 @@ class WebSocketManager:
                         
                         if advance_success:
                             # Clear accumulated text when advancing to a new state
-                            self.accumulated_texts[ws_id] = ""
+                            conn.accumulated_text = ""
                             
                             # Reset first followup flag for new question
-                            self.first_followup_flags[call_sid] = True
+                            conn.first_followup = True
                             self.logger.info(f"Reset first followup flag for call {call_sid} - new question")
                             
                             if next_audio_or_text:
@@ -688,35 +714,35 @@ class WebSocketManager:
                                 total_state_latency = elevenlabs_state_end_time - deepgram_end_time
                                 self.logger.info(f"LATENCY_TOTAL_STATE: From user silence to AI speaking next question: {total_state_latency:.2f}s")
                                 
-                                await self._send_mark(ws_id)
-                                self.speaking_flags[ws_id].set()
+                                final_mark = await self._send_mark(ws_id)
+                                conn.speaking_flag.set()
                                 
                                 # Check if this is the final goodbye message
                                 if isinstance(next_audio_or_text, str) and "thank you for your time" in next_audio_or_text.lower() and "goodbye" in next_audio_or_text.lower():
                                     self.logger.info(f"Final message detected for {ws_id}, will close connection after audio completes")
                                     # Set a flag to close the connection after the final message
-                                    asyncio.create_task(self._close_after_final_message(ws_id))
+                                    self._spawn(self._close_after_final_message(ws_id, final_mark))
                             else:
                                 self.logger.warning(f"No audio to play after state advancement for {ws_id}")
                     
                     
                 
                 # Handle long silence with no input
-                elif elapsed_time > 5 and not self.accumulated_texts[ws_id] and not self.speaking_flags[ws_id].is_set():
+                elif elapsed_time > 5 and not conn.accumulated_text and not conn.speaking_flag.is_set():
                     self.logger.info(f"Long silence detected for {ws_id}, sending prompt")
                     silence_message = "You are not audible. Could you please repeat that?"
                     
                     # Stream audio for silence message directly
                     await self._stream_elevenlabs_audio(ws_id, silence_message)
                     await self._send_mark(ws_id)
-                    self.speaking_flags[ws_id].set()
+                    conn.speaking_flag.set()
                     interaction_time = time.time()
                     
             except Exception as e:
                 self.logger.error(f"Error in Deepgram receiver for {ws_id}: {e}")
                 import traceback
                 self.logger.error(traceback.format_exc())
-                if self.exit_events[ws_id].is_set():
+                if conn.exit_event.is_set():
                     break
                 
                 
@@ -727,13 +753,14 @@ class WebSocketManager:
     async def _check_for_transcript(self, ws_id, timeout=0.1):
         """Check for new transcription from Deepgram"""
         try:
-            if ws_id not in self.deepgram_connections or not self.deepgram_connections[ws_id]:
+            conn = self.connections.get(ws_id)
+            if not conn or not conn.deepgram_connection:
                 self.logger.warning(f"No Deepgram connection for {ws_id} in _check_for_transcript")
                 return None
             
             # Set timeout to prevent blocking indefinitely
             select_task = asyncio.ensure_future(
-                self.deepgram_connections[ws_id].recv()
+                conn.deepgram_connection.recv()
             )
             
             # Wait for message with timeout
@@ -751,7 +778,7 @@ class WebSocketManager:
                 
                 # Try to parse the message
                 try:
-                    message_json = json.loads(message)
+                    message_json = orjson.loads(message)
                     
                     # Check for transcript in the response
                     if "channel" in message_json and "alternatives" in message_json["channel"]:
@@ -764,7 +791,7 @@ class WebSocketManager:
                     
                     # Anything else is likely a status message
                     return None
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     self.logger.warning(f"Invalid JSON from Deepgram for {ws_id}: {message[:100]}...")
                     return None
             
@@ -784,9 +811,10 @@ class WebSocketManager:
     
 
     async def _send_mark(self, ws_id, occasion="default"):
-        """Send a mark message to Twilio"""
+        """Send a mark message to Twilio and return its label"""
         try:
-            if ws_id not in self.active_connections or not self.stream_sids.get(ws_id):
+            conn = self.connections.get(ws_id)
+            if not conn or not conn.stream_sid:
                 return
                 
             if occasion == "default":
@@ -795,61 +823,61 @@ class WebSocketManager:
                 mark_label = "end call"
                 
             message = {
-                "streamSid": self.stream_sids[ws_id],
+                "streamSid": conn.stream_sid,
                 "event": "mark",
                 "mark": {"name": mark_label}
             }
             
-            await self.active_connections[ws_id].send(json.dumps(message))
-            self.marks[ws_id].append(mark_label)
+            conn.mark_events[mark_label] = asyncio.Event()
+            await conn.websocket.send(orjson.dumps(message).decode())
+            conn.marks.append(mark_label)
+            return mark_label
             
         except Exception as e:
             self.logger.error(f"Error sending mark: {e}")
+            return None
     
     async def _replay_audio(self, ws_id):
         """Replay the current audio when interrupted"""
         try:
             # Check if buffer exists
-            if ws_id not in self.current_audio_buffer or not self.current_audio_buffer[ws_id]:
+            conn = self.connections.get(ws_id)
+            if not conn or not conn.current_audio_buffer:
                 self.logger.error(f"INTERRUPTION_DEBUG: No audio buffer to replay for {ws_id}")
                 return False
             
             # Validate buffer size
             min_buffer_size = 1000  # Minimum size in bytes for a valid audio buffer
-            if len(self.current_audio_buffer[ws_id]) < min_buffer_size:
-                self.logger.error(f"INTERRUPTION_DEBUG: Audio buffer too small ({len(self.current_audio_buffer[ws_id])} bytes) to replay for {ws_id}")
+            if len(conn.current_audio_buffer) < min_buffer_size:
+                self.logger.error(f"INTERRUPTION_DEBUG: Audio buffer too small ({len(conn.current_audio_buffer)} bytes) to replay for {ws_id}")
                 return False
                 
-            # Check replay count
-            if ws_id not in self.replay_counts:
-                self.replay_counts[ws_id] = 0
-            
             # Increase replay limit to 3 for testing
-            if self.replay_counts[ws_id] >= 3:
-                self.logger.error(f"INTERRUPTION_DEBUG: Replay limit reached ({self.replay_counts[ws_id]}/3) for {ws_id}, not replaying")
+            if conn.replay_count >= 3:
+                self.logger.error(f"INTERRUPTION_DEBUG: Replay limit reached ({conn.replay_count}/3) for {ws_id}, not replaying")
                 return False
             
-            self.replay_counts[ws_id] += 1
+            conn.replay_count += 1
             
-            self.logger.info(f"INTERRUPTION_DEBUG: Replaying audio due to interruption for {ws_id} (attempt {self.replay_counts[ws_id]}/3)")
+            self.logger.info(f"INTERRUPTION_DEBUG: Replaying audio due to interruption for {ws_id} (attempt {conn.replay_count}/3)")
             
             # If we have text, log it
-            if ws_id in self.current_audio_text and self.current_audio_text[ws_id]:
-                self.logger.info(f"INTERRUPTION_DEBUG: Replaying text: {self.current_audio_text[ws_id]}")
+            if conn.current_audio_text:
+                self.logger.info(f"INTERRUPTION_DEBUG: Replaying text: {conn.current_audio_text}")
             
             # Stream the buffered audio
-            self.logger.info(f"INTERRUPTION_DEBUG: Streaming audio buffer of size {len(self.current_audio_buffer[ws_id])} bytes")
+            self.logger.info(f"INTERRUPTION_DEBUG: Streaming audio buffer of size {len(conn.current_audio_buffer)} bytes")
             await self.audio_service.stream_audio(
                 ws_id=ws_id,
-                audio_data=self.current_audio_buffer[ws_id],
-                active_connections=self.active_connections,
-                stream_sids=self.stream_sids
+                audio_data=conn.current_audio_buffer,
+                client_ws=conn.websocket,
+                stream_sid=conn.stream_sid
             )
             
             # Send mark and set speaking flag
             self.logger.info(f"INTERRUPTION_DEBUG: Sending mark and setting speaking flag for {ws_id}")
             await self._send_mark(ws_id)
-            self.speaking_flags[ws_id].set()
+            conn.speaking_flag.set()
             
             return True
             
@@ -862,12 +890,13 @@ class WebSocketManager:
     async def _heartbeat(self, ws_id):
         """Send periodic heartbeat to keep the connection alive"""
         try:
-            while not self.exit_events[ws_id].is_set():
+            exit_event = self.connections[ws_id].exit_event
+            while not exit_event.is_set():
                 # Log heartbeat every 10 seconds
                 self.logger.info(f"Heartbeat for {ws_id}")
                 # Wait for 10 seconds or until exit event is set
                 try:
-                    await asyncio.wait_for(self.exit_events[ws_id].wait(), timeout=10)
+                    await asyncio.wait_for(exit_event.wait(), timeout=10)
                 except asyncio.TimeoutError:
                     
                     pass
@@ -886,8 +915,9 @@ class WebSocketManager:
                 self.logger.error(f"Failed to create Deepgram socket for {ws_id}")
                 return False
                 
-            self.deepgram_connections[ws_id] = deepgram_ws
-            self.deepgram_ready_events[ws_id].set()
+            conn = self.connections[ws_id]
+            conn.deepgram_connection = deepgram_ws
+            conn.deepgram_ready.set()
             self.logger.info(f"Connected to Deepgram for {ws_id}")
             return True
             
@@ -898,135 +928,122 @@ class WebSocketManager:
             return False
             
 
+    def _spawn(self, coro):
+        """Start a background task and keep a reference to it until it finishes"""
+        task = asyncio.create_task(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return task
+
     def _cleanup_connection(self, ws_id):
         """Clean up resources when a connection closes"""
         self.logger.info(f"Cleaning up connection {ws_id}")
         
-        # Set exit event
-        if ws_id in self.exit_events:
-            self.exit_events[ws_id].set()
-            
-        # Close Deepgram connection
-        if ws_id in self.deepgram_connections and self.deepgram_connections[ws_id]:
+        # Remove from tracking; everything below works from the popped record
+        conn = self.connections.pop(ws_id, None)
+        
+        if conn:
+            # Set exit event
+            conn.exit_event.set()
+            # Close Deepgram and end the conversation in Memory B in the background
+            self._spawn(self._close_connection_resources(ws_id, conn))
+                
+        self.logger.info(f"Connection cleanup completed for {ws_id}")
+
+    async def _close_connection_resources(self, ws_id, conn):
+        """End the Memory B conversation and send CloseStream to Deepgram"""
+        if conn.call_sid:
+            self.logger.info(f"Ending conversation for call {conn.call_sid}")
             try:
-                self.deepgram_connections[ws_id].send(json.dumps({"type": "CloseStream"}))
-                self.logger.info(f"Sent close stream to Deepgram for {ws_id}")
+                self.memory_b.end_conversation(conn.call_sid)
             except Exception as e:
-                self.logger.error(f"Error closing Deepgram connection for {ws_id}: {e}")
-                
-        # End conversation in Memory B
-        if ws_id in self.call_sids:
-            call_sid = self.call_sids[ws_id]
+                self.logger.error(f"Error closing resources for {ws_id}: {e}")
+        if conn.deepgram_connection and not conn.deepgram_connection.closed:
             try:
-                # Use asyncio.create_task to avoid blocking
-                asyncio.create_task(self.memory_b.end_conversation(call_sid))
-                self.logger.info(f"Ending conversation for call {call_sid}")
+                await conn.deepgram_connection.send(DEEPGRAM_CLOSE_STREAM)
             except Exception as e:
-                self.logger.error(f"Error ending conversation for call {call_sid}: {e}")
-                
-        # Remove from tracking dictionaries
-        for tracking_dict in [
-            self.active_connections, self.deepgram_connections, 
-            self.stream_sids, self.call_sids, self.exit_events,
-            self.speaking_flags, self.deepgram_ready_events,
-            self.current_audio_buffer, self.current_audio_text, self.interruption_detected, self.replay_counts,
-            self.audio_buffers, self.accumulated_texts, self.marks, self.interaction_times,
-            self.first_followup_flags
-        ]:
-            if ws_id in tracking_dict:
-                tracking_dict.pop(ws_id, None)
-                
-        self.logger.info(f"Connection cleanup completed for {ws_id}")
+                self.logger.error(f"Error closing resources for {ws_id}: {e}")
 
     async def _stream_audio(self, ws_id, audio_data):
         """Stream pre-generated audio data to Twilio"""
+        conn = self.connections[ws_id]
         return await self.audio_service.stream_audio(
             ws_id=ws_id,
             audio_data=audio_data,
-            active_connections=self.active_connections,
-            stream_sids=self.stream_sids
+            client_ws=conn.websocket,
+            stream_sid=conn.stream_sid
         )
         
     async def _stream_elevenlabs_audio(self, ws_id, text):
         """Stream audio generated by ElevenLabs to Twilio"""
+        conn = self.connections[ws_id]
         audio_buffer = await self.audio_service.stream_elevenlabs_audio(
             ws_id=ws_id,
             text=text,
-            active_connections=self.active_connections,
-            stream_sids=self.stream_sids,
+            client_ws=conn.websocket,
+            stream_sid=conn.stream_sid,
             elevenlabs_service=self.conversation_manager.elevenlabs_service,
             collect_audio=True
         )
         
         # Store the audio buffer and text for potential replay
-        self.current_audio_buffer[ws_id] = audio_buffer
-        self.current_audio_text[ws_id] = text
+        conn.current_audio_buffer = audio_buffer
+        conn.current_audio_text = text
         # Reset replay counter for new audio
-        self.replay_counts[ws_id] = 0
+        conn.replay_count = 0
         
         return audio_buffer
 
-    async def _buffer_elevenlabs_chunks(self, text, chunk_queue):
-        """Buffer chunks from ElevenLabs async generator and put them in queue"""
-        buffer_start_time = time.time()
-        chunk_count = 0
-        async for chunk in self.conversation_manager.elevenlabs_service.text_to_speech(text):
-            await chunk_queue.put(chunk)
-            chunk_count += 1
-            if chunk_count % 5 == 0:  # Logging every 5 chunks
-                current_time = time.time()
-                self.logger.info(f"BUFFER_PROGRESS: Collected {chunk_count} chunks in {current_time - buffer_start_time:.2f}s")
-        
-        # Signal end of chunks
-        await chunk_queue.put(None)
-        buffer_end_time = time.time()
-        buffer_duration = buffer_end_time - buffer_start_time
-        self.logger.info(f"BUFFER_COMPLETE: Collected all {chunk_count} chunks in {buffer_duration:.2f}s")
-        return chunk_count
-
-    async def _stream_from_queue(self, ws_id, chunk_queue, text):
-        """Stream chunks from queue as they become available"""
+    async def _stream_from_queue(self, ws_id, audio_batches, text):
+        """Stream batches of chunks from a buffered ElevenLabs iterator as they become available"""
+        conn = self.connections[ws_id]
         stream_start_time = time.time()
         chunks = []
         chunk_count = 0
         
-        while True:
-            chunk = await chunk_queue.get()
-            if chunk is None:  # End of chunks
-                break
-                
-            # Stream the chunk
-            media_message = {
-                "event": "media",
-                "streamSid": self.stream_sids.get(ws_id),
-                "media": {"payload": chunk}
-            }
-            await self.active_connections[ws_id].send(json.dumps(media_message))
-            chunks.append(chunk)
-            chunk_count += 1
+        try:
+            async for batch in audio_batches:
+                # Coalesce the ready chunks into one media message spliced into the prebuilt envelope
+                await conn.websocket.send(conn.media_prefix + encode_payload(b"".join(batch)) + MEDIA_SUFFIX)
+                chunks.extend(batch)
+                previous_count = chunk_count
+                chunk_count += len(batch)
             
-            if chunk_count % 5 == 0:
-                current_time = time.time()
-                self.logger.info(f"STREAM_PROGRESS: Streamed {chunk_count} chunks in {current_time - stream_start_time:.2f}s")
+                if chunk_count // 5 > previous_count // 5:
+                    current_time = time.time()
+                    self.logger.info(f"STREAM_PROGRESS: Streamed {chunk_count} chunks in {current_time - stream_start_time:.2f}s")
+        except asyncio.TimeoutError:
+            # The TTS producer stalled; stop waiting so the connection state is not held forever
+            self.logger.warning(f"No audio from ElevenLabs for 15s, ending stream for {ws_id}")
         
         stream_end_time = time.time()
         stream_duration = stream_end_time - stream_start_time
         self.logger.info(f"STREAM_COMPLETE: Streamed all {chunk_count} chunks in {stream_duration:.2f}s")
         
         # Store audio for potential replay
-        audio_data = b''.join([base64.b64decode(chunk) for chunk in chunks])
-        self.current_audio_buffer[ws_id] = audio_data
-        self.current_audio_text[ws_id] = text
-        self.replay_counts[ws_id] = 0
+        conn.current_audio_buffer = b"".join(chunks)
+        conn.current_audio_text = text
+        conn.replay_count = 0
 
-    async def _close_after_final_message(self, ws_id):
+    async def _close_after_final_message(self, ws_id, final_mark=None):
         """Close the connection after the final message"""
         try:
             self.logger.info(f"Waiting for final message to complete for {ws_id}")
-            # Wait a few seconds for the audio to finish playing
-            await asyncio.sleep(5)
+            # Wait for Twilio to report the final mark as played; if it was already
+            # played (or never sent) there is nothing to wait for
+            conn = self.connections.get(ws_id)
+            mark_event = conn.mark_events.get(final_mark) if conn else None
+            if mark_event:
+                # Also stop waiting if the connection goes away first (e.g. the caller hung up)
+                waiters = [asyncio.create_task(mark_event.wait()), asyncio.create_task(conn.exit_event.wait())]
+                done, pending = await asyncio.wait(waiters, timeout=10.0, return_when=asyncio.FIRST_COMPLETED)
+                for waiter in pending:
+                    waiter.cancel()
+                if not done:
+                    self.logger.warning(f"Final mark not received within 10s for {ws_id}, closing anyway")
             self.logger.info(f"Final message completed, closing connection for {ws_id}")
-            self.exit_events[ws_id].set()
+            if conn:
+                conn.exit_event.set()
         except Exception as e:
             self.logger.error(f"Error closing connection after final message for {ws_id}: {e}")
 
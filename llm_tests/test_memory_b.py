@@ -17,6 +17,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Shared decoder for pulling the JSON object out of LLM responses
+json_decoder = json.JSONDecoder()
+
 from memory.memory_b import MemoryB, ConversationState
 from services.LLM_agent import LanguageModelProcessor
 
@@ -34,7 +37,7 @@ async def test_with_predefined_responses(call_sid, memory, llm_processor, questi
     logger.info(f"Starting test with predefined responses for call {call_sid}")
     
     # Initialize conversation
-    await memory.initialize_conversation(call_sid, initial_state=0)
+    memory.initialize_conversation(call_sid, initial_state=0)
     
     # Get the question data for the specified question index
     question_data = next((q for q in questions_data if q["state"] == question_index), None)
@@ -57,13 +60,13 @@ async def test_with_predefined_responses(call_sid, memory, llm_processor, questi
     # Test each scenario for the specified question
     for i, test_case in enumerate(question_test_cases):
         # Reset state for each test case
-        await memory.initialize_conversation(call_sid, initial_state=0)
+        memory.initialize_conversation(call_sid, initial_state=0)
         
         logger.info(f"\n=== Test Case {i+1}: {test_case['name']} ===")
         logger.info(f"Question: {question}")
         
         # Update state with current question
-        await memory.update_state(
+        memory.update_state(
             call_sid=call_sid,
             state_index=question_index,  # Use the specified question index
             original_question=question,
@@ -77,7 +80,7 @@ async def test_with_predefined_responses(call_sid, memory, llm_processor, questi
         logger.info(f"User response: {initial_response}")
         
         # Buffer the response
-        await memory.buffer_response(call_sid, initial_response)
+        memory.buffer_response(call_sid, initial_response)
         
         # Initialize extracted values
         extracted_values = {}
@@ -127,25 +130,14 @@ Analyze the user's response and determine which category it falls into:
         # Process with LLM
         llm_response = llm_processor.process(prompt)
         
-        # Find JSON in the response
-        json_start = llm_response.find('{')
-        json_end = llm_response.rfind('}')
-        
-        if json_start >= 0 and json_end > json_start:
-            json_str = llm_response[json_start:json_end+1]
-            logger.info(f"LLM analysis: {json_str}")
-        else:
-            logger.info(f"LLM analysis: {llm_response}")
-        
         # Parse LLM response
         try:
-            # Find JSON in the response
+            # Decode the JSON object in place, starting at the first brace
             json_start = llm_response.find('{')
-            json_end = llm_response.rfind('}')
             
-            if json_start >= 0 and json_end > json_start:
-                json_str = llm_response[json_start:json_end+1]
-                analysis = json.loads(json_str)
+            if json_start >= 0:
+                analysis, json_end = json_decoder.raw_decode(llm_response, json_start)
+                logger.info(f"LLM analysis: {llm_response[json_start:json_end]}")
                 response_type = analysis.get("response_type", "default")
                 
                 if "extracted_value" in analysis and analysis["extracted_value"]:
@@ -153,6 +145,7 @@ Analyze the user's response and determine which category it falls into:
                     extracted_values["value"] = str(analysis["extracted_value"])
                     logger.info(f"Extracted value: {analysis['extracted_value']}")
             else:
+                logger.info(f"LLM analysis: {llm_response}")
                 # Fallback to simulated analysis based on test case
                 response_type = test_case["expected_pattern"]
                 logger.warning(f"Could not parse LLM response, falling back to expected pattern: {response_type}")
@@ -167,7 +160,7 @@ Analyze the user's response and determine which category it falls into:
             logger.warning(f"Expected pattern '{expected_pattern}' but got '{response_type}'")
         
         # Update state with the response
-        await memory.update_state(
+        memory.update_state(
             call_sid=call_sid,
             last_response=initial_response,
             response_type=response_type,
@@ -203,7 +196,7 @@ Analyze the user's response and determine which category it falls into:
             followup_qa_pairs = [{"question": followup_text, "answer": ""}]
             
             # Update state with followup
-            await memory.update_state(
+            memory.update_state(
                 call_sid=call_sid,
                 followup_attempts=1,
                 followup_qa_pairs=followup_qa_pairs
@@ -215,15 +208,15 @@ Analyze the user's response and determine which category it falls into:
                 logger.info(f"Follow-up response: {followup_response}")
                 
                 # Buffer the followup response
-                await memory.buffer_response(call_sid, followup_response)
+                memory.buffer_response(call_sid, followup_response)
                 
                 # Update the followup QA pair with the answer
-                state = await memory.get_state(call_sid)
+                state = memory.get_state(call_sid)
                 followup_qa_pairs = state.followup_qa_pairs
                 followup_qa_pairs[0]["answer"] = followup_response
                 
                 # Update state with the followup response
-                await memory.update_state(
+                memory.update_state(
                     call_sid=call_sid,
                     last_response=followup_response,
                     followup_attempts=2,  # Increment followup attempts
@@ -236,13 +229,13 @@ Analyze the user's response and determine which category it falls into:
                     logger.info(f"Second follow-up response: {followup_response2}")
                     
                     # Buffer the second followup response
-                    await memory.buffer_response(call_sid, followup_response2)
+                    memory.buffer_response(call_sid, followup_response2)
                     
                     # Update the followup QA pair with the answer
                     followup_qa_pairs.append({"question": followup_text, "answer": followup_response2})
                     
                     # Update state with the second followup response
-                    await memory.update_state(
+                    memory.update_state(
                         call_sid=call_sid,
                         last_response=followup_response2,
                         followup_attempts=3,  # Max attempts
@@ -252,18 +245,18 @@ Analyze the user's response and determine which category it falls into:
             logger.warning(f"Expected followup but none was generated")
         
         # Check if should advance state
-        should_advance = await memory.should_advance_state(call_sid)
+        should_advance = memory.should_advance_state(call_sid)
         logger.info(f"Should advance state: {should_advance}")
         
         if test_case["should_advance"] != should_advance:
             logger.warning(f"Expected should_advance={test_case['should_advance']} but got {should_advance}")
         
         # Always advance state for testing
-        new_state = await memory.advance_state(call_sid)
+        new_state = memory.advance_state(call_sid)
         logger.info(f"Advanced to state: {new_state}")
         
         # Clear conversation at the end of each test case
-        await memory.clear_conversation(call_sid)
+        memory.clear_conversation(call_sid)
         logger.info(f"Test case completed: {test_case['name']}")
     
     logger.info(f"All test cases for question {question_index} completed")
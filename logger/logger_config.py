@@ -1,9 +1,12 @@
 import logging
 import logging.config
 import logging.handlers
-from queue import Queue
+from queue import Queue, Full, Empty
 from threading import Thread
+import atexit
 import os
+import sys
+import orjson
 
 log_dir = os.path.join(os.getcwd(), 'logs')
 log_file = os.path.join(log_dir, 'app.log.jsonl')
@@ -11,6 +14,15 @@ log_file = os.path.join(log_dir, 'app.log.jsonl')
 if not os.path.exists(log_dir):
     os.makedirs(log_dir)
 
+LOG_MAX_BYTES = 1048576
+LOG_BACKUP_COUNT = 5
+LOG_BATCH_SIZE = 100
+LOG_QUEUE_SIZE = 10000
+# Evict-and-retry attempts before a record is dropped when other threads keep refilling a full queue
+LOG_ENQUEUE_ATTEMPTS = 3
+# Seconds shutdown waits for the writer to flush before giving up
+LOG_STOP_TIMEOUT = 5
+
 LOGGING_CONFIG = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -21,12 +33,12 @@ LOGGING_CONFIG = {
         },
         "json": {
             "()": "logging.Formatter",
-            "format": '{"level": "%(levelname)s", "timestamp": "%(asctime)s", "message": "%(message)s", "module": "%(module)s", "function": "%(funcName)s", "line": %(lineno)d}'
+            "format": '{"level": "%(levelname)s", "ts": %(created).3f, "message": "%(message)s", "module": "%(module)s", "function": "%(funcName)s", "line": %(lineno)d}'
         }
     },
     "handlers": {
         "queue": {
-            "class": "logging.handlers.QueueHandler",
+            "()": None,  # Set programmatically later
             "queue": None  # Set programmatically later
         },
         "stderr": {
@@ -50,19 +62,128 @@ LOGGING_CONFIG = {
     }
 }
 
-log_queue = Queue()
+_STOP = None
+
+
+class FastJsonHandler(logging.Handler):
+    """Hand raw record fields to the writer thread; all formatting happens off the caller's thread"""
+
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
+        # Records dropped because the queue stayed full
+        self.dropped = 0
+
+    def emit(self, record):
+        try:
+            message = record.getMessage()
+            if record.exc_info:
+                message = f"{message}\n{logging.Formatter().formatException(record.exc_info)}"
+            self.enqueue((record.levelname, record.created, message, record.module, record.funcName, record.lineno))
+        except Exception:
+            self.handleError(record)
+
+    def enqueue(self, item):
+        """Never block the caller: when the queue is full, drop the oldest record"""
+        for _ in range(LOG_ENQUEUE_ATTEMPTS):
+            try:
+                self.queue.put_nowait(item)
+                return
+            except Full:
+                # Another thread may take the freed slot before we do, so evict and retry
+                try:
+                    evicted = self.queue.get_nowait()
+                except Empty:
+                    continue
+                if evicted is _STOP:
+                    # Shutting down: the writer must still see the stop marker, so this record goes instead
+                    try:
+                        self.queue.put_nowait(_STOP)
+                    except Full:
+                        pass
+                    break
+        self.dropped += 1
+
+
+class LogWriter(Thread):
+    """Writer thread that serializes queued records with orjson and writes them in batches"""
+
+    def __init__(self, queue, filename, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT):
+        super().__init__(name="log-writer", daemon=True)
+        self.queue = queue
+        self.filename = filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.file = open(filename, "ab")
+        self.size = self.file.tell()
+
+    def run(self):
+        while True:
+            # Block for the first record, then take whatever else is already queued
+            batch = [self.queue.get()]
+            while len(batch) < LOG_BATCH_SIZE and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            stopping = _STOP in batch
+            records = [item for item in batch if item is not _STOP]
+            if records:
+                self._write(records)
+            if stopping:
+                self.file.close()
+                return
+
+    def _write(self, records):
+        try:
+            lines = b"".join(
+                orjson.dumps({
+                    "level": level,
+                    "ts": created,
+                    "message": message,
+                    "module": module,
+                    "function": function,
+                    "line": line
+                }) + b"\n"
+                for level, created, message, module, function, line in records
+            )
+            if self.size + len(lines) > self.max_bytes and self.size > 0:
+                self._rollover()
+            self.file.write(lines)
+            self.file.flush()
+            self.size += len(lines)
+
+            sys.stderr.write("".join(
+                f"[{level}|{module}] {message}\n" for level, _, message, module, _, _ in records
+            ))
+        except Exception as e:
+            sys.stderr.write(f"Log writer failed: {e}\n")
+
+    def _rollover(self):
+        """Rotate app.log.jsonl -> app.log.jsonl.1 -> ... like RotatingFileHandler"""
+        self.file.close()
+        for i in range(self.backup_count - 1, 0, -1):
+            src = f"{self.filename}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.filename}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.filename, f"{self.filename}.1")
+        self.file = open(self.filename, "ab")
+        self.size = 0
+
+    def stop(self):
+        try:
+            self.queue.put(_STOP, timeout=LOG_STOP_TIMEOUT)
+        except Full:
+            pass
+        # Bounded so a lost stop marker can never hang interpreter shutdown
+        self.join(LOG_STOP_TIMEOUT)
+
 
-file_handler = logging.handlers.RotatingFileHandler(
-    filename="logs/app.log.jsonl",
-    maxBytes=1048576,
-    backupCount=5
-)
-file_handler.setFormatter(logging.Formatter('{"level": "%(levelname)s", "message": "%(message)s", "time": "%(asctime)s"}'))
+log_queue = Queue(maxsize=LOG_QUEUE_SIZE)
 
-stderr_handler = logging.StreamHandler()
-stderr_handler.setFormatter(logging.Formatter("[%(levelname)s|%(module)s] %(message)s"))
-listener = logging.handlers.QueueListener(log_queue, file_handler, stderr_handler)
+listener = LogWriter(log_queue, log_file)
+LOGGING_CONFIG["handlers"]["queue"]["()"] = FastJsonHandler
 LOGGING_CONFIG["handlers"]["queue"]["queue"] = log_queue
 logging.config.dictConfig(LOGGING_CONFIG)
 listener.start()
-logger = logging.getLogger("app_logger")
\ No newline at end of file
+atexit.register(listener.stop)
+logger = logging.getLogger("app_logger")
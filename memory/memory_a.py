@@ -5,26 +5,48 @@ Memory A (Question Bank)
 - Questions are converted to audio via ElevenLabs and stored before actual conversation
 """
 
-import json
+import orjson
 import asyncio
 from typing import Dict, Optional, List, Any
 import logging
 
+from utils.tts_cache import tts_cache
+
+# Maximum number of question TTS requests in flight during pre-generation
+TTS_CONCURRENCY = 8
+
 class MemoryA:
     """
     Memory A (Question Bank) - Stores pre-generated audio for questions indexed by state
     """
     def __init__(self):
         self.question_audio_bank: Dict[int, bytes] = {}  # state_index -> audio_bytes
+        self.audio_ready_events: Dict[int, asyncio.Event] = {}  # state_index -> set once audio is stored
+        self.questions_by_state: Dict[int, Dict[str, Any]] = {}  # state_index -> question data
         self.questions_data: List[Dict[str, Any]] = []
+        self.tts_cache = tts_cache
         self.is_initialized = False
         self.logger = logging.getLogger(__name__)
 
+    @property
+    def questions_data(self) -> List[Dict[str, Any]]:
+        return self._questions_data
+
+    @questions_data.setter
+    def questions_data(self, questions: List[Dict[str, Any]]) -> None:
+        """Replace the question list and rebuild the state index"""
+        self._questions_data = questions
+        self.questions_by_state = {}
+        for question in questions:
+            # The first entry for a state wins, matching the old linear scan
+            if 'state' in question:
+                self.questions_by_state.setdefault(question['state'], question)
+
     async def initialize_with_questions(self, questions_file_path: str):
         """Load questions from JSON file"""
         try:
-            with open(questions_file_path, 'r') as f:
-                self.questions_data = json.load(f)
+            with open(questions_file_path, 'rb') as f:
+                self.questions_data = orjson.loads(f.read())
             self.logger.info(f"Loaded {len(self.questions_data)} questions into Memory A")
             self.is_initialized = True
             return True
@@ -44,7 +66,23 @@ class MemoryA:
             self.logger.error("No questions data available for audio pre-generation")
             return False
             
+        # Bound the number of concurrent TTS requests to respect rate limits
+        semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+        
+        async def generate(state, question_text):
+            try:
+                async with semaphore:
+                    # Generate audio using TTS service (or load it from the disk cache)
+                    audio_data = await self.tts_cache.text_to_speech_full(tts_service, question_text)
+                
+                # Store in memory bank
+                self.store_question_audio(state, audio_data)
+                self.logger.info(f"Pre-generated audio for state {state}")
+            except Exception as e:
+                self.logger.error(f"Error pre-generating audio for state {state}: {str(e)}")
+            
         try:
+            jobs = []
             for question_data in self.questions_data:
                 state = question_data.get('state')
                 question_text = question_data.get('question')
@@ -54,41 +92,47 @@ class MemoryA:
                     continue
                 
                 # Skip check for skip_llm_processing - we still need audio for all questions
+                jobs.append(generate(state, question_text))
                 
-                # Generate audio using TTS service
-                audio_data = await tts_service.text_to_speech_full(question_text)
-                
-                # Store in memory bank
-                await self.store_question_audio(state, audio_data)
-                self.logger.info(f"Pre-generated audio for state {state}")
-                
+            await asyncio.gather(*jobs)
             return True
         except Exception as e:
             self.logger.error(f"Error pre-generating audio: {str(e)}")
             return False
 
-    async def store_question_audio(self, state: int, audio_data: bytes) -> None:
+    def store_question_audio(self, state: int, audio_data: bytes) -> None:
         """Store audio data for a specific state"""
         self.question_audio_bank[state] = audio_data
+        self._audio_ready_event(state).set()
         
-    async def get_question_audio(self, state: int) -> Optional[bytes]:
+    def get_question_audio(self, state: int) -> Optional[bytes]:
         """Retrieve audio data for a specific state"""
         return self.question_audio_bank.get(state)
         
+    async def wait_for_question_audio(self, state: int) -> Optional[bytes]:
+        """Wait until audio for a specific state has been stored, then return it"""
+        await self._audio_ready_event(state).wait()
+        return self.question_audio_bank.get(state)
+
+    def _audio_ready_event(self, state: int) -> asyncio.Event:
+        event = self.audio_ready_events.get(state)
+        if event is None:
+            event = self.audio_ready_events[state] = asyncio.Event()
+        return event
+        
     def get_question_data(self, state: int) -> Optional[Dict[str, Any]]:
         """Get question data for a specific state"""
-        for question in self.questions_data:
-            if question.get('state') == state:
-                return question
-        return None
+        return self.questions_by_state.get(state)
 
     def is_audio_ready(self, state: int) -> bool:
         """Check if audio for a specific state is ready"""
         return state in self.question_audio_bank
 
-    async def clear(self):
+    def clear(self):
         """Clear all stored audio data"""
         self.question_audio_bank.clear()
+        for event in self.audio_ready_events.values():
+            event.clear()
         self.logger.info("Memory A cleared")
 
 
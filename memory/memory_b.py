@@ -9,10 +9,11 @@ Memory B (Conversation Buffer)
 import asyncio
 from typing import Dict, Optional, Any, List
 import logging
+import re
 from dataclasses import dataclass, field
-from datetime import datetime
+import time
 
-@dataclass
+@dataclass(slots=True)
 class ConversationState:
     """Class for tracking conversation state"""
     state_index: int = 0
@@ -20,7 +21,7 @@ class ConversationState:
     expected_output_type: str = ""
     last_response: str = ""
     follow_up_instructions: str = ""
-    last_update_time: datetime = field(default_factory=datetime.now)
+    last_update_time: float = field(default_factory=time.monotonic)  # time.monotonic() seconds, for age checks
     max_attempts: int = 2
     original_question: str = ""
     expected_output: str = ""
@@ -31,81 +32,89 @@ class ConversationState:
     response_type: str = ""
     response_categories: Dict[str, str] = field(default_factory=dict)
 
+# Matches {placeholder} in follow-up templates
+PLACEHOLDER_RE = re.compile(r"\{([^{}]+)\}")
+
+# Fields callers may set through MemoryB.update_state
+UPDATABLE_FIELDS = frozenset(ConversationState.__dataclass_fields__) - {"last_update_time"}
+
+def _notice_period_template(state: ConversationState) -> Optional[str]:
+    """Pick the notice period (state 5) template from the extracted duration"""
+    duration_value = state.extracted_values.get("duration", 0)
+    if duration_value > state.extracted_values.get("notice_period_threshold", 90):
+        return "long_notice"
+    if duration_value > 0:
+        return "short_notice"
+    if state.response_type == "immediate_pattern":
+        return "immediate"
+    return None
+
+# state_index -> rule choosing a follow-up template for that state (None falls back to the response type)
+TEMPLATE_RULES = {
+    5: _notice_period_template,
+}
+
 class MemoryB:
     """
     Memory B (Conversation Buffer) - Handles active conversation state and user responses
     """
+    __slots__ = ("conversation_states", "response_buffers", "locks", "logger")
+    
     def __init__(self):
         self.conversation_states: Dict[str, ConversationState] = {}  # call_sid -> ConversationState
         self.response_buffers: Dict[str, str] = {}  # call_sid -> current_response_text
+        self.locks: Dict[str, asyncio.Lock] = {}  # call_sid -> lock held across read-modify-write sequences
         self.logger = logging.getLogger(__name__)
         
-    async def initialize_conversation(self, call_sid: str, initial_state: int = 0) -> None:
+    def lock(self, call_sid: str) -> asyncio.Lock:
+        """
+        Get the lock for a call.
+        Individual methods never await mid-update, so they are atomic on the event loop;
+        callers that read state, await, then write it back should hold this lock.
+        """
+        lock = self.locks.get(call_sid)
+        if lock is None:
+            lock = self.locks[call_sid] = asyncio.Lock()
+        return lock
+        
+    def _drop_lock(self, call_sid: str) -> None:
+        """
+        Forget the lock for a call unless it is held.
+        Clearing can run under the lock (advance_state -> clear_conversation); dropping it
+        then would let the next lock() hand out a fresh lock while the old one is still held.
+        """
+        lock = self.locks.get(call_sid)
+        if lock is not None and not lock.locked():
+            del self.locks[call_sid]
+        
+    def initialize_conversation(self, call_sid: str, initial_state: int = 0) -> None:
         """Initialize a new conversation state for a call"""
         self.conversation_states[call_sid] = ConversationState(state_index=initial_state)
         self.response_buffers[call_sid] = ""
         self.logger.info(f"Initialized conversation state for call {call_sid}")
         
-    async def update_state(
-        self, 
-        call_sid: str, 
-        state_index: Optional[int] = None,
-        attempts: Optional[int] = None,
-        expected_output_type: Optional[str] = None,
-        last_response: Optional[str] = None,
-        follow_up_instructions: Optional[str] = None,
-        max_attempts: Optional[int] = None,
-        original_question: Optional[str] = None,
-        expected_output: Optional[str] = None,
-        followup_attempts: Optional[int] = None,
-        followup_qa_pairs: Optional[list] = None,
-        max_followup_attempts: Optional[int] = None,
-        extracted_values: Optional[Dict[str, Any]] = None,
-        response_type: Optional[str] = None,
-        response_categories: Optional[Dict[str, str]] = None
-    ) -> None:
-        """Update conversation state parameters"""
+    def update_state(self, call_sid: str, **fields: Any) -> None:
+        """Update conversation state parameters; fields passed as None are left unchanged"""
         if call_sid not in self.conversation_states:
-            await self.initialize_conversation(call_sid)
+            self.initialize_conversation(call_sid)
             
         state = self.conversation_states[call_sid]
         
-        if state_index is not None:
-            state.state_index = state_index
-        if attempts is not None:
-            state.attempts = attempts
-        if expected_output_type is not None:
-            state.expected_output_type = expected_output_type
-        if last_response is not None:
-            state.last_response = last_response
-        if follow_up_instructions is not None:
-            state.follow_up_instructions = follow_up_instructions
-        if max_attempts is not None:
-            state.max_attempts = max_attempts
-        if original_question is not None:
-            state.original_question = original_question
-        if expected_output is not None:
-            state.expected_output = expected_output
-        if followup_attempts is not None:
-            state.followup_attempts = followup_attempts
-        if followup_qa_pairs is not None:
-            state.followup_qa_pairs = followup_qa_pairs
-        if max_followup_attempts is not None:
-            state.max_followup_attempts = max_followup_attempts
-        if extracted_values is not None:
-            state.extracted_values = extracted_values
-        if response_type is not None:
-            state.response_type = response_type
-        if response_categories is not None:
-            state.response_categories = response_categories
+        for name, value in fields.items():
+            if value is None:
+                continue
+            if name in UPDATABLE_FIELDS:
+                setattr(state, name, value)
+            else:
+                self.logger.warning(f"Ignoring unknown conversation state field '{name}' for call {call_sid}")
             
-        state.last_update_time = datetime.now()
+        state.last_update_time = time.monotonic()
         
-    async def get_state(self, call_sid: str) -> Optional[ConversationState]:
+    def get_state(self, call_sid: str) -> Optional[ConversationState]:
         """Get current conversation state"""
         return self.conversation_states.get(call_sid)
         
-    async def buffer_response(self, call_sid: str, response_text: str) -> None:
+    def buffer_response(self, call_sid: str, response_text: str) -> None:
         """Store user response text in buffer"""
         if call_sid not in self.response_buffers:
             self.response_buffers[call_sid] = ""
@@ -113,23 +122,23 @@ class MemoryB:
         self.response_buffers[call_sid] = response_text
         self.logger.info(f"Buffered response for call {call_sid}: {response_text[:30]}...")
         
-    async def get_buffered_response(self, call_sid: str) -> str:
+    def get_buffered_response(self, call_sid: str) -> str:
         """Get the current buffered response"""
         return self.response_buffers.get(call_sid, "")
         
-    async def clear_buffer(self, call_sid: str) -> None:
+    def clear_buffer(self, call_sid: str) -> None:
         """Clear the response buffer for a call"""
         if call_sid in self.response_buffers:
             self.response_buffers[call_sid] = ""
             
-    async def increment_attempts(self, call_sid: str) -> int:
+    def increment_attempts(self, call_sid: str) -> int:
         """Increment the number of attempts for the current state"""
         if call_sid in self.conversation_states:
             self.conversation_states[call_sid].attempts += 1
             return self.conversation_states[call_sid].attempts
         return 0
         
-    async def advance_state(self, call_sid: str) -> int:
+    def advance_state(self, call_sid: str) -> int:
         """
         Advance to the next state and reset attempts
         Returns the new state index
@@ -143,12 +152,12 @@ class MemoryB:
             state.followup_qa_pairs = []
             state.extracted_values = {}
             state.response_type = ""
-            state.last_update_time = datetime.now()
+            state.last_update_time = time.monotonic()
             self.logger.info(f"Advanced to state {state.state_index} for call {call_sid}")
             return state.state_index
         return 0
         
-    async def should_advance_state(self, call_sid: str) -> bool:
+    def should_advance_state(self, call_sid: str) -> bool:
         """
         Determine if we should advance to the next state based on:
         1. Expected output achieved, or
@@ -177,17 +186,18 @@ class MemoryB:
         # Don't auto-advance for response types that might need follow-ups
         return False
         
-    async def clear_conversation(self, call_sid: str) -> None:
+    def clear_conversation(self, call_sid: str) -> None:
         """Clear all conversation data for a call"""
         self.conversation_states.pop(call_sid, None)
         self.response_buffers.pop(call_sid, None)
+        self._drop_lock(call_sid)
         self.logger.info(f"Cleared conversation data for call {call_sid}")
         
     def is_conversation_active(self, call_sid: str) -> bool:
         """Check if a conversation is currently active"""
         return call_sid in self.conversation_states
 
-    async def set_question_data(self, call_sid: str, question: str, expected_output: str, 
+    def set_question_data(self, call_sid: str, question: str, expected_output: str, 
                                response_categories: Optional[Dict[str, str]] = None,
                                max_followups: Optional[int] = None) -> None:
         """Set the original question and expected output for a conversation state."""
@@ -206,7 +216,7 @@ class MemoryB:
             
         self.logger.info(f"Set question data for call_sid: {call_sid}")
     
-    async def add_followup_qa(self, call_sid: str, question: str, answer: str) -> bool:
+    def add_followup_qa(self, call_sid: str, question: str, answer: str) -> bool:
         """Add a follow-up question and answer pair to the conversation."""
         if call_sid not in self.conversation_states:
             self.logger.warning(f"No conversation found for call_sid: {call_sid}")
@@ -214,12 +224,12 @@ class MemoryB:
         
         self.conversation_states[call_sid].followup_qa_pairs.append((question, answer))
         self.conversation_states[call_sid].followup_attempts += 1
-        self.conversation_states[call_sid].last_update_time = datetime.now()
+        self.conversation_states[call_sid].last_update_time = time.monotonic()
         
         self.logger.info(f"Added followup Q&A for call_sid: {call_sid}, attempt: {self.conversation_states[call_sid].followup_attempts}")
         return True
     
-    async def can_ask_followup(self, call_sid: str) -> bool:
+    def can_ask_followup(self, call_sid: str) -> bool:
         """Check if we can ask another follow-up question."""
         if call_sid not in self.conversation_states:
             self.logger.warning(f"No conversation found for call_sid: {call_sid}")
@@ -227,7 +237,7 @@ class MemoryB:
         
         return self.conversation_states[call_sid].followup_attempts < self.conversation_states[call_sid].max_followup_attempts
     
-    async def get_followup_attempts(self, call_sid: str) -> int:
+    def get_followup_attempts(self, call_sid: str) -> int:
         """Get the number of follow-up attempts made for a conversation."""
         if call_sid not in self.conversation_states:
             self.logger.warning(f"No conversation found for call_sid: {call_sid}")
@@ -235,7 +245,7 @@ class MemoryB:
         
         return self.conversation_states[call_sid].followup_attempts
     
-    async def set_extracted_value(self, call_sid: str, key: str, value: Any) -> None:
+    def set_extracted_value(self, call_sid: str, key: str, value: Any) -> None:
         """Store an extracted value from the user response."""
         if call_sid not in self.conversation_states:
             self.logger.warning(f"No conversation found for call_sid: {call_sid}")
@@ -244,7 +254,7 @@ class MemoryB:
         self.conversation_states[call_sid].extracted_values[key] = value
         self.logger.info(f"Set extracted value for call_sid: {call_sid}, key: {key}, value: {value}")
     
-    async def set_response_type(self, call_sid: str, response_type: str) -> None:
+    def set_response_type(self, call_sid: str, response_type: str) -> None:
         """Set the detected response type."""
         if call_sid not in self.conversation_states:
             self.logger.warning(f"No conversation found for call_sid: {call_sid}")
@@ -253,30 +263,24 @@ class MemoryB:
         self.conversation_states[call_sid].response_type = response_type
         self.logger.info(f"Set response type for call_sid: {call_sid}, type: {response_type}")
     
-    async def get_follow_up_template(self, call_sid: str) -> str:
+    def get_follow_up_template(self, call_sid: str) -> str:
         """Get the appropriate follow-up template based on response type."""
         if call_sid not in self.conversation_states:
             self.logger.warning(f"No conversation found for call_sid: {call_sid}")
             return ""
             
         state = self.conversation_states[call_sid]
-        response_type = state.response_type
         
-        # Special case for notice period
-        if state.state_index == 5:
-            duration_value = state.extracted_values.get("duration", 0)
-            threshold = state.extracted_values.get("notice_period_threshold", 90)
-            
-            if duration_value > threshold:
-                return "long_notice"
-            elif duration_value > 0:
-                return "short_notice"
-            elif response_type == "immediate_pattern":
-                return "immediate"
+        # State-specific rules take precedence over the plain response type
+        rule = TEMPLATE_RULES.get(state.state_index)
+        if rule:
+            template = rule(state)
+            if template:
+                return template
         
-        return response_type if response_type else "default"
+        return state.response_type or "default"
     
-    async def format_follow_up_question(self, call_sid: str, template: str) -> str:
+    def format_follow_up_question(self, call_sid: str, template: str) -> str:
         """Format a follow-up question template with extracted values."""
         if call_sid not in self.conversation_states:
             self.logger.warning(f"No conversation found for call_sid: {call_sid}")
@@ -284,16 +288,14 @@ class MemoryB:
             
         state = self.conversation_states[call_sid]
         
-        # Replace any placeholders with extracted values
-        formatted_template = template
-        for key, value in state.extracted_values.items():
-            placeholder = "{" + key + "}"
-            if placeholder in formatted_template:
-                formatted_template = formatted_template.replace(placeholder, str(value))
-                
-        return formatted_template
+        # Replace any placeholders with extracted values in a single pass; unknown ones are left as-is
+        values = state.extracted_values
+        return PLACEHOLDER_RE.sub(
+            lambda match: str(values[match.group(1)]) if match.group(1) in values else match.group(0),
+            template
+        )
         
-    async def get_conversation_data(self, call_sid: str) -> Dict[str, Any]:
+    def get_conversation_data(self, call_sid: str) -> Dict[str, Any]:
         """Get all data for a conversation that would be needed by LLM."""
         if call_sid not in self.conversation_states:
             self.logger.warning(f"No conversation found for call_sid: {call_sid}")
@@ -301,13 +303,11 @@ class MemoryB:
         
         conv = self.conversation_states[call_sid]
         
-        # Compile all user responses into a single string
-        user_responses = " ".join([self.response_buffers[call_sid]])
+        # Only the latest response is buffered per call
+        user_responses = self.response_buffers.get(call_sid, "")
         
         # Format followup QA pairs
-        followup_qa = []
-        for q, a in conv.followup_qa_pairs:
-            followup_qa.append({"question": q, "answer": a})
+        followup_qa = [{"question": q, "answer": a} for q, a in conv.followup_qa_pairs]
         
         return {
             "state": conv.state_index,
@@ -320,7 +320,7 @@ class MemoryB:
             "extracted_values": conv.extracted_values
         }
 
-    async def end_conversation(self, call_sid: str) -> None:
+    def end_conversation(self, call_sid: str) -> None:
         """End a conversation and clean up resources"""
         if call_sid in self.conversation_states:
             self.logger.info(f"Ending conversation for call {call_sid}")
@@ -334,3 +334,5 @@ class MemoryB:
             self.logger.info(f"Conversation ended and resources cleaned up for call {call_sid}")
         else:
             self.logger.warning(f"Attempted to end non-existent conversation for call {call_sid}")
+        # Also catches a lock kept by a clear_conversation that ran while it was held
+        self._drop_lock(call_sid)
@@ -6,17 +6,35 @@ Memory C (Filler Phrases)
 """
 
 import json
+import base64
 import random
+import re
+import asyncio
 import logging
-from typing import Dict, List, Optional, Any
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Any, Tuple
+
+from utils.streaming import MEDIA_SUFFIX
+from utils.tts_cache import tts_cache
+
+# Maximum number of filler TTS requests in flight during pre-generation
+TTS_CONCURRENCY = 5
+
+STATE_FILLER_KEY = re.compile(r"state_\d+_followup")
 
 class MemoryC:
     """
     Memory C (Filler Phrases) - Stores pre-generated audio for filler phrases
     """
     def __init__(self):
-        self.filler_audio_bank: Dict[str, bytes] = {}  # filler_key -> audio_bytes
-        self.filler_data: Dict[str, str] = {}  # filler_key -> filler_text
+        # Read-only views; they are replaced wholesale so the key tuples below never go stale
+        self.filler_audio_bank: Mapping[str, bytes] = MappingProxyType({})  # filler_key -> audio_bytes
+        self.filler_media_tail_bank: Mapping[str, str] = MappingProxyType({})  # filler_key -> base64 payload + end of the Twilio media message
+        self.filler_data: Mapping[str, str] = MappingProxyType({})  # filler_key -> filler_text
+        self.filler_keys: Tuple[str, ...] = ()  # keys of filler_data, fixed once fillers are loaded
+        self.random_filler_keys: Tuple[str, ...] = ()  # keys get_random_filler_audio picks from
+        self.state_filler_keys: Dict[int, str] = {}  # state -> key of its generated followup filler
+        self.tts_cache = tts_cache
         self.is_initialized = False
         self.logger = logging.getLogger(__name__)
 
@@ -28,14 +46,15 @@ class MemoryC:
             fillers_dict: Dictionary of filler_key -> filler_text
         """
         if fillers_dict:
-            self.filler_data = fillers_dict
-            self.logger.info(f"Loaded {len(self.filler_data)} fillers into Memory C")
+            self.filler_data = MappingProxyType(dict(fillers_dict))
+            self.filler_keys = tuple(self.filler_data)
+            self.logger.info("Loaded %d fillers into Memory C", len(self.filler_data))
             self.is_initialized = True
             return True
         else:
             # Default fillers if none provided - organized by state for followup questions
             # Using hesitation markers and elongated vowels to sound more natural
-            self.filler_data = {
+            self.filler_data = MappingProxyType({
                 # State 1 followup
                 "state_1_followup": "Okay... tell me",
                 
@@ -52,8 +71,9 @@ class MemoryC:
                 "generic_1": "I see...",
                 "generic_2": "Hmm...",
                 "generic_3": "Interesting..."
-            }
-            self.logger.info(f"Loaded {len(self.filler_data)} default fillers into Memory C")
+            })
+            self.filler_keys = tuple(self.filler_data)
+            self.logger.info("Loaded %d default fillers into Memory C", len(self.filler_data))
             self.is_initialized = True
             return True
 
@@ -65,23 +85,57 @@ class MemoryC:
             self.logger.error("No filler data available for audio pre-generation")
             return False
             
+        # Bound the number of concurrent TTS requests to respect rate limits
+        semaphore = asyncio.Semaphore(TTS_CONCURRENCY)
+        
+        async def generate(filler_text):
+            async with semaphore:
+                self.logger.info("Generating audio for filler: %s", filler_text)
+                
+                # Generate audio using the TTS service (or load it from the disk cache)
+                return await self.tts_cache.text_to_speech_full(tts_service, filler_text)
+            
         try:
+            # Keys that share the same text share one TTS request
+            unique_texts = list(dict.fromkeys(self.filler_data.values()))
+            results = await asyncio.gather(
+                *(generate(filler_text) for filler_text in unique_texts),
+                return_exceptions=True
+            )
+            audio_by_text = dict(zip(unique_texts, results))
+            
+            # Store in memory, keeping the filler order
+            audio_bank = {}
+            media_tail_bank = {}
             for filler_key, filler_text in self.filler_data.items():
-                self.logger.info(f"Generating audio for filler: {filler_key}")
-                
-                # Generate audio using the TTS service
-                audio_data = await tts_service.text_to_speech_full(filler_text)
-                
-                # Store in memory
-                self.filler_audio_bank[filler_key] = audio_data
+                audio_data = audio_by_text[filler_text]
+                if isinstance(audio_data, Exception):
+                    self.logger.error("Error generating audio for filler %s: %s", filler_key, audio_data)
+                    continue
+                audio_bank[filler_key] = audio_data
+                # Encode once here so playback only has to put the stream's envelope prefix in front
+                media_tail_bank[filler_key] = base64.b64encode(audio_data).decode('utf-8') + MEDIA_SUFFIX
+                self.logger.info("Audio generated for filler: %s", filler_key)
                 
-                self.logger.info(f"Audio generated for filler: {filler_key}")
-                
-            self.logger.info(f"Pre-generated audio for {len(self.filler_audio_bank)} fillers")
+            self.filler_audio_bank = MappingProxyType(audio_bank)
+            self.filler_media_tail_bank = MappingProxyType(media_tail_bank)
+            # Index the state followup fillers ("state_<n>_followup") by state number
+            self.state_filler_keys = {
+                int(filler_key.split("_")[1]): filler_key
+                for filler_key in audio_bank
+                if STATE_FILLER_KEY.fullmatch(filler_key)
+            }
+            
+            # Prefer generic fillers for random picks; fall back to any available filler
+            self.random_filler_keys = (
+                tuple(k for k in self.filler_audio_bank if k.startswith("generic_"))
+                or tuple(self.filler_audio_bank)
+            )
+            self.logger.info("Pre-generated audio for %d fillers", len(self.filler_audio_bank))
             return True
             
         except Exception as e:
-            self.logger.error(f"Error pre-generating audio for fillers: {str(e)}")
+            self.logger.error("Error pre-generating audio for fillers: %s", e)
             return False
 
     def get_filler_audio(self, filler_key: str) -> Optional[bytes]:
@@ -90,51 +144,57 @@ class MemoryC:
         """
         return self.filler_audio_bank.get(filler_key)
 
-    def get_state_filler_audio(self, state: int) -> Optional[bytes]:
+    def get_filler_key(self, state: int = None) -> Optional[str]:
         """
-        Get filler audio for a specific state's followup question
+        Pick the filler to play: the state's followup filler if one was generated,
+        otherwise a random generic filler
         
         Args:
-            state: The conversation state number
+            state: The conversation state number, or None for a random filler
         """
-        filler_key = f"state_{state}_followup"
-        
         # Check if we have a filler for this state
-        if filler_key in self.filler_audio_bank:
-            return self.filler_audio_bank.get(filler_key)
+        filler_key = self.state_filler_keys.get(state)
+        if filler_key is not None:
+            return filler_key
             
         # Fall back to generic filler if no state-specific one exists
-        return self.get_random_filler_audio()
+        if not self.random_filler_keys:
+            self.logger.warning("No filler audio available")
+            return None
+            
+        return random.choice(self.random_filler_keys)
+
+    def get_state_filler_audio(self, state: int) -> Optional[bytes]:
+        """
+        Get filler audio for a specific state's followup question
+        
+        Args:
+            state: The conversation state number
+        """
+        return self.filler_audio_bank.get(self.get_filler_key(state))
 
     def get_random_filler_audio(self) -> Optional[bytes]:
         """
         Get a random filler audio from the bank (generic fillers only)
         """
-        if not self.filler_audio_bank:
-            self.logger.warning("No filler audio available")
-            return None
-            
-        # Filter for generic fillers
-        generic_keys = [k for k in self.filler_audio_bank.keys() if k.startswith("generic_")]
-        
-        if not generic_keys:
-            # If no generic fillers, use any available filler
-            filler_key = random.choice(list(self.filler_audio_bank.keys()))
-        else:
-            filler_key = random.choice(generic_keys)
-            
-        return self.filler_audio_bank.get(filler_key)
+        return self.filler_audio_bank.get(self.get_filler_key())
+
+    def get_filler_media_tail(self, state: int = None) -> Optional[str]:
+        """
+        Get the pre-encoded Twilio media message tail (payload and closing braces) of the
+        filler for a state (or a random filler); prepend build_media_prefix(stream_sid) to send it
+        """
+        return self.filler_media_tail_bank.get(self.get_filler_key(state))
     
     def get_random_filler_text(self) -> Optional[str]:
         """
         Get a random filler text
         """
-        if not self.filler_data:
+        if not self.filler_keys:
             self.logger.warning("No filler text available")
             return None
             
-        filler_key = random.choice(list(self.filler_data.keys()))
-        return self.filler_data.get(filler_key)
+        return self.filler_data.get(random.choice(self.filler_keys))
 
     def is_audio_ready(self, filler_key: str) -> bool:
         """
@@ -146,4 +206,4 @@ class MemoryC:
         """
         Get all available filler keys
         """
-        return list(self.filler_data.keys())
+        return list(self.filler_keys)
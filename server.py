@@ -17,6 +17,8 @@ from services.Deepgram_service import DeepgramService
 from services.LLM_agent import LanguageModelProcessor
 from tasks.poll_queue import poll_queue
 from tasks.check_status_second import call_status_check
+from utils.dedup import RecentMessageSet
+from utils.event_loop import install_uvloop
 
 # Configure logging
 from logger.logger_config import logger
@@ -38,9 +40,9 @@ class AICallServer:
         self.logger = logging.getLogger(__name__)
         
         # Initialize shared data for outbound calls
-        self.shared_data = {"call_instance_list": []}
-        self.queue_messages = {"message_list": []}
-        self.duplicate_message_set = set()
+        self.shared_data = {"call_instance_list": [], "call_instance_by_message_id": {}}
+        self.queue_messages = {"message_list": [], "message_ids": set(), "receipt_handles": {}}
+        self.duplicate_message_set = RecentMessageSet(maxsize=10000)
         self.call_status_mapping = {
             "canceled": 0, 
             "completed": 1, 
@@ -98,6 +100,10 @@ class AICallServer:
         # Health check
         self.app.router.add_get('/health', self.health_check)
         
+        # Open pooled connections on the serving loop and release them on shutdown
+        self.app.on_startup.append(self.on_startup)
+        self.app.on_cleanup.append(self.on_cleanup)
+        
     async def handle_webhook(self, request):
         """Handle Twilio webhook requests"""
         try:
@@ -137,6 +143,15 @@ class AICallServer:
         """Simple health check endpoint"""
         return web.json_response({"status": "ok"})
         
+    async def on_startup(self, app):
+        """Open Deepgram sockets ahead of the first call"""
+        await self.deepgram_service.prewarm()
+        
+    async def on_cleanup(self, app):
+        """Close long-lived client sessions when the web app shuts down"""
+        await self.elevenlabs_service.close()
+        await self.deepgram_service.close()
+        
     async def initialize(self):
         """Initialize components that require async setup"""
         try:
@@ -182,5 +197,6 @@ class AICallServer:
 
 
 if __name__ == "__main__":
+    install_uvloop()
     server = AICallServer()
     server.run()
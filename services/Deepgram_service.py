@@ -1,26 +1,87 @@
 import asyncio
+import logging
+from collections import deque
+
 import websockets
 
+# Number of unused Deepgram sockets kept open for new calls
+POOL_SIZE = 2
+# Deepgram drops sockets that receive no audio for ~10 seconds
+KEEPALIVE_INTERVAL = 5
+KEEPALIVE_MESSAGE = '{"type": "KeepAlive"}'
+
 class DeepgramService:
-    
+
     def __init__(self,config_loader):
         self.api_key = config_loader.get('deepgram', 'deepgram_api_key')
         self.deepgram_url = config_loader.get('deepgram', 'deep_gram_url')
-        self.ws = None  
+        self.ws = None
+        # Warm sockets handed out by connect(); each is used by at most one call
+        self.pool = deque()
+        self.pool_size = 0
+        self.keepalive_task = None
+        self.logger = logging.getLogger(__name__)
 
-    async def connect(self):
+    async def _open(self):
         headers = {'Authorization': f'Token {self.api_key}'}
-        self.ws = await websockets.connect(
+        return await websockets.connect(
             self.deepgram_url,
             extra_headers=headers,
             ping_interval=10,
-            ping_timeout=5 
+            ping_timeout=5
         )
+
+    async def prewarm(self, pool_size: int = POOL_SIZE):
+        """Open sockets ahead of time so new calls skip the TCP/TLS/WebSocket handshake"""
+        self.pool_size = pool_size
+        missing = pool_size - len(self.pool)
+        if missing > 0:
+            results = await asyncio.gather(*(self._open() for _ in range(missing)), return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    self.logger.warning(f"Deepgram pre-connect failed: {result}")
+                else:
+                    self.pool.append(result)
+        if self.keepalive_task is None:
+            self.keepalive_task = asyncio.create_task(self._keepalive())
+
+    async def _keepalive(self):
+        """Keep pooled sockets open and top the pool back up"""
+        while True:
+            await asyncio.sleep(KEEPALIVE_INTERVAL)
+            for ws in list(self.pool):
+                try:
+                    await ws.send(KEEPALIVE_MESSAGE)
+                except Exception:
+                    # connect() may have taken it while we were sending
+                    if ws in self.pool:
+                        self.pool.remove(ws)
+            try:
+                await self.prewarm(self.pool_size)
+            except Exception as e:
+                self.logger.warning(f"Error refilling Deepgram pool: {e}")
+
+    async def connect(self):
+        # Prefer a warm socket; a socket carries one stream, so it is never returned to the pool
+        while self.pool:
+            ws = self.pool.popleft()
+            if not ws.closed:
+                self.ws = ws
+                return self.ws
+        self.ws = await self._open()
         return self.ws  # Return the WebSocket connection
 
+    async def close(self):
+        """Stop the keepalive task and close pooled sockets"""
+        if self.keepalive_task:
+            self.keepalive_task.cancel()
+            self.keepalive_task = None
+        while self.pool:
+            await self.pool.popleft().close()
+
     async def __aenter__(self):
         return await self.connect()
 
     async def __aexit__(self, exc_type, exc, tb):
         if self.ws:
-            await self.ws.close()
\ No newline at end of file
+            await self.ws.close()
@@ -1,34 +1,70 @@
-from elevenlabs import VoiceSettings
-from elevenlabs.client import ElevenLabs
-import base64
+import aiohttp
+import asyncio
 import io
 import logging
 
+# aiohttp only accepts a base_url without a path, so the API version goes on each request path
+ELEVENLABS_API_URL = "https://api.elevenlabs.io"
+ELEVENLABS_API_PREFIX = "/v1"
+# Maximum number of pooled connections to ElevenLabs
+HTTP_POOL_SIZE = 20
+# Default number of live streaming TTS requests allowed at once across all calls;
+# sized to match the number of calls poll_queue dials at once
+TTS_CONCURRENT_REQUESTS = 10
+
 class ElevenLabsService:
     def __init__(self,config_loader):
         self.tts_voice_id = config_loader.get('tts', 'voice_id')
         self.elevenlabs_api_key = config_loader.get('tts', 'api_key')
         self.elevenlabs_model = config_loader.get('tts', 'tts_model')
+        # Caps live streams so concurrent calls queue here instead of hitting ElevenLabs rate limits
+        self.stream_semaphore = asyncio.Semaphore(
+            int(config_loader.get('tts', 'concurrent_requests', fallback=TTS_CONCURRENT_REQUESTS))
+        )
         
-        self.client = ElevenLabs(api_key=self.elevenlabs_api_key)
-        self.voice_settings = VoiceSettings(stability=0.6, similarity_boost=1.0, style=0.7, use_speaker_boost=True)
+        self.voice_settings = {"stability": 0.6, "similarity_boost": 1.0, "style": 0.7, "use_speaker_boost": True}
+        # Created lazily inside the running event loop; keeps the HTTPS connection to ElevenLabs alive between requests
+        self.session = None
         self.logger = logging.getLogger(__name__)
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                base_url=ELEVENLABS_API_URL,
+                headers={"xi-api-key": self.elevenlabs_api_key},
+                connector=aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, ttl_dns_cache=300, keepalive_timeout=60)
+            )
+        return self.session
+
+    def _tts_request(self, path: str, text: str, params: dict):
+        """POST a text-to-speech request; the caller reads the response body"""
+        return self._get_session().post(
+            f"{ELEVENLABS_API_PREFIX}/{path}",
+            params=params,
+            json={
+                "text": text,
+                "model_id": self.elevenlabs_model,
+                "voice_settings": self.voice_settings
+            }
+        )
+
+    async def close(self):
+        """Close the HTTP session"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
  
     async def text_to_speech(self, text: str):
         """
         Stream audio in chunks for real-time playback
-        Returns base64-encoded audio chunks as a generator
+        Returns raw ulaw_8000 audio chunks as a generator; callers base64-encode them for Twilio
         """
-        audio_stream = self.client.text_to_speech.convert_as_stream(
-            text=text,
-            voice_id=self.tts_voice_id,
-            model_id=self.elevenlabs_model,
-            voice_settings=self.voice_settings,
-            output_format="ulaw_8000",
-            optimize_streaming_latency=2
-        )
-        for chunk in audio_stream:
-            yield base64.b64encode(chunk).decode('utf-8')
+        params = {"output_format": "ulaw_8000", "optimize_streaming_latency": "2"}
+        # Held for the whole stream; consumers allow for the wait before the first chunk
+        async with self.stream_semaphore:
+            async with self._tts_request(f"text-to-speech/{self.tts_voice_id}/stream", text, params) as response:
+                response.raise_for_status()
+                async for chunk in response.content.iter_chunked(4096):
+                    yield chunk
             
     async def text_to_speech_full(self, text: str) -> bytes:
         """
@@ -36,29 +72,18 @@ class ElevenLabsService:
         Returns the full audio as bytes for storage in Memory A
         """
         try:
-            self.logger.info(f"Generating full audio for text: {text[:30]}...")
+            self.logger.info("Generating full audio for text: %.30s...", text)
             
             # Generate audio as a complete file
-            audio_data = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=self.tts_voice_id,
-                model_id=self.elevenlabs_model,
-                voice_settings=self.voice_settings,
-                output_format="ulaw_8000"
-            )
+            async with self._tts_request(f"text-to-speech/{self.tts_voice_id}", text, {"output_format": "ulaw_8000"}) as response:
+                response.raise_for_status()
+                audio_data = await response.read()
             
-            # If audio_data is a generator, collect all chunks
-            if hasattr(audio_data, '__iter__') and not isinstance(audio_data, (bytes, bytearray)):
-                collected_data = bytearray()
-                for chunk in audio_data:
-                    collected_data.extend(chunk)
-                audio_data = bytes(collected_data)
-            
-            self.logger.info(f"Generated {len(audio_data)} bytes of audio")
+            self.logger.info("Generated %d bytes of audio", len(audio_data))
             return audio_data
             
         except Exception as e:
-            self.logger.error(f"Error generating audio: {str(e)}")
+            self.logger.error("Error generating audio: %s", e)
             # Return empty bytes in case of error
             return b""
 
@@ -80,34 +105,27 @@ async def generate_audio(api_key, voice_id, text, model="eleven_flash_v2"):
     from elevenlabs.client import ElevenLabs
     
     logger = logging.getLogger(__name__)
-    logger.info(f"Generating audio for: {text[:30]}...")
+    logger.info("Generating audio for: %.30s...", text)
     
     try:
         # Initialize client
         client = ElevenLabs(api_key=api_key)
         voice_settings = VoiceSettings(stability=0.6, similarity_boost=1.0, style=0.1, use_speaker_boost=True)
         
-        # Generate audio
-        audio_data = client.text_to_speech.convert(
+        # Generate audio; the SDK always returns an iterator of byte chunks, joined once here
+        audio_data = b"".join(client.text_to_speech.convert(
             text=text,
             voice_id=voice_id,
             model_id=model,
             voice_settings=voice_settings,
             output_format="mp3_44100_128",  # Use valid format instead of just "mp3"
             optimize_streaming_latency=4
-        )
-        
-        # If audio_data is a generator, collect all chunks
-        if hasattr(audio_data, '__iter__') and not isinstance(audio_data, (bytes, bytearray)):
-            collected_data = bytearray()
-            for chunk in audio_data:
-                collected_data.extend(chunk)
-            audio_data = bytes(collected_data)
+        ))
         
-        logger.info(f"Generated {len(audio_data)} bytes of audio")
+        logger.info("Generated %d bytes of audio", len(audio_data))
         return audio_data
         
     except Exception as e:
-        logger.error(f"Error generating audio: {str(e)}")
+        logger.error("Error generating audio: %s", e)
         # Return empty bytes in case of error
         return b""
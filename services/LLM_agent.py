@@ -1,251 +1,141 @@
-import boto3
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from services.aws_clients import get_bedrock
+from services.llm_cache import ExactCache
+
+# Marks the end of a stable prompt prefix so Bedrock can cache it between requests
+CACHE_POINT = {"cachePoint": {"type": "default"}}
+
+# Turns (user + assistant pairs) kept verbatim once the history is trimmed
+MAX_TURNS = 8
+# Roughly 6k tokens; older turns are summarized once the history text grows past this
+HISTORY_CHAR_BUDGET = 24000
+SUMMARY_PROMPT = "Summarize the following dialogue in at most 200 tokens, keeping every fact the candidate gave:\n\n"
+SYSTEM_PROMPT_PATH = 'system_prompt.txt'
+
+
+@lru_cache(maxsize=None)
+def load_system_prompt(path: str = SYSTEM_PROMPT_PATH) -> str:
+    """Read a system prompt file once per process; later processors reuse the text"""
+    with open(path, 'r') as file:
+        return file.read().strip()
 
 
 class LanguageModelProcessor:
-    def __init__(self,config_loader):
+    def __init__(self,config_loader, system_prompt: str = None):
         self.aws_access_key_id = config_loader.get('aws', 'aws_access_key_id')
         self.aws_secret_access_key = config_loader.get('aws', 'aws_secret_access_key')
         self.aws_region = config_loader.get('aws', 'aws_region')
 
-        self.llm = boto3.client(
-            "bedrock-runtime",
-            region_name=self.aws_region,
-            aws_access_key_id=self.aws_access_key_id,
-            aws_secret_access_key=self.aws_secret_access_key
-        )
+        self.llm = get_bedrock(self.aws_region, self.aws_access_key_id, self.aws_secret_access_key)
         self.model_id = config_loader.get("llm",'model_id')
-
-        with open('system_prompt.txt', 'r') as file:
-            system_prompt = file.read().strip()
-        
-        self.messages = [{"role":"user","content":[{"text":system_prompt}]}]
-
-    def process(self, text: str) -> str:
-        self.messages[0]["content"][0]["text"]+=f"role :user ,content:{text}\n"
-        response = self.llm.converse(
-            modelId=self.model_id,
-            messages=self.messages,
-        )
-        response_text = response["output"]["message"]["content"][0]["text"]
-        self.messages[0]["content"][0]["text"]+=f"role :agent ,content:{response_text}\n"
+        # Prompt caching is only available on some Bedrock models and others reject cachePoint
+        # blocks, so it stays off unless [llm] prompt_caching = true is set for a supported model
+        self.prompt_caching = config_loader.get('llm', 'prompt_caching', fallback='false').lower() == 'true'
+        self.max_turns = int(config_loader.get('llm', 'max_turns', fallback=MAX_TURNS))
+        self.history_char_budget = int(config_loader.get('llm', 'history_char_budget', fallback=HISTORY_CHAR_BUDGET))
+
+        if system_prompt is None:
+            system_prompt = load_system_prompt()
+
+        # The instructions go in the Converse system field; the turns are kept as real messages
+        self.system = [{"text": system_prompt}]
+        if self.prompt_caching:
+            self.system.append(CACHE_POINT)
+        self.messages = []
+        # Running length of the history text, so trimming doesn't rescan every turn
+        self.history_chars = 0
+        # Summaries of trimmed turns are written in the background, off the turn being answered
+        self.summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="llm-summary")
+        self.pending_summary = None
+        self.response_cache = ExactCache(maxsize=int(config_loader.get('llm', 'response_cache_size', fallback=4096)))
+
+    def process(self, text: str, cacheable: bool = False) -> str:
+        """
+        Send one user turn and return the model's reply.
+        Pass cacheable=True for self-contained prompts; an identical earlier prompt is then
+        answered from memory without a Bedrock round trip.
+        """
+        self._apply_summary()
+        user_message = {"role": "user", "content": [{"text": text}]}
+        if cacheable:
+            cache_key = ExactCache.key(self.model_id, self.system[0]["text"], text)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                # Keep the history consistent with what the model would have seen
+                self.messages.append(user_message)
+                self.messages.append({"role": "assistant", "content": [{"text": cached}]})
+                self.history_chars += len(text) + len(cached)
+                # Trimming waits for the next Bedrock turn, so a hit never does more than append
+                return cached
+        if self.prompt_caching:
+            # Cache everything up to and including this turn for the next request
+            self.messages.append({"role": "user", "content": [{"text": text}, CACHE_POINT]})
+        else:
+            self.messages.append(user_message)
+        try:
+            response = self.llm.converse(
+                modelId=self.model_id,
+                system=self.system,
+                messages=self.messages,
+            )
+        except Exception:
+            # Drop the failed turn, so the history keeps alternating user/assistant
+            self.messages.pop()
+            raise
+        message = response["output"]["message"]
+        # The next turn places its own cache point
+        self.messages[-1] = user_message
+        self.messages.append(message)
+        self.history_chars += len(text) + self._text_chars(message)
+        self._trim_history()
+        response_text = message["content"][0]["text"]
+        if cacheable:
+            self.response_cache.put(cache_key, response_text)
         return response_text
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-# import os
-# import boto3
-# import json
-# import time
-# import logging
-# from typing import Dict, List, Union, Any, Optional, AsyncGenerator
-# import asyncio
-# import configparser
-
-# # Configure logging
-# logging.basicConfig(
-#     level=logging.INFO,
-#     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-#     handlers=[logging.StreamHandler()]
-# )
-# logger = logging.getLogger(__name__)
-
-# class LanguageModelProcessor:
-#     def __init__(self, config):
-#         """
-#         Initialize the LanguageModelProcessor.
-
-#         Args:
-#             config: ConfigParser object containing necessary configuration parameters
-#         """
-#         # Load configuration values
-#         self.model_id = config.get('llm', 'model_id')
-#         self.aws_region = config.get('aws', 'aws_region')
-#         self.aws_access_key_id = config.get('aws', 'aws_access_key_id')
-#         self.aws_secret_access_key = config.get('aws', 'aws_secret_access_key')
-        
-#         # Initialize AWS Bedrock client
-#         self.llm = boto3.client(
-#             "bedrock-runtime",
-#             region_name=self.aws_region,
-#             aws_access_key_id=self.aws_access_key_id,
-#             aws_secret_access_key=self.aws_secret_access_key
-#         )
-        
-#         # Default system prompt - will be included with each request
-#         self.system_prompt = "You are a helpful, harmless, and honest AI assistant. You help a human with answering questions."
-#         # Initialize conversation history
-#         self.conversation_history = ""
-
-#     def process(self, text: str) -> str:
-#         """
-#         Process text with the language model (non-streaming).
-        
-#         Args:
-#             text: Input text to be processed
-            
-#         Returns:
-#             str: Generated response
-#         """
-#         start_time = time.time()
-#         logger.info(f"Processing input with LLM: {text[:50]}...")
-        
-#         # Add user message to history
-#         self.conversation_history += f"\nUser: {text}\n"
-        
-#         # Format message for Bedrock (using only supported roles)
-#         messages = [
-#             {
-#                 "role": "user", 
-#                 "content": [
-#                     {
-#                         "text": f"{self.system_prompt}\n\n{self.conversation_history}\nAssistant:"
-#                     }
-#                 ]
-#             }
-#         ]
-        
-#         try:
-#             # Send request to model
-#             response = self.llm.converse(
-#                 modelId=self.model_id,
-#                 messages=messages
-#             )
-            
-#             # Extract and return response content
-#             if response and 'messages' in response and len(response['messages']) > 0:
-#                 message = response['messages'][0]
-#                 if 'content' in message and len(message['content']) > 0:
-#                     content = message['content'][0]
-#                     if 'text' in content:
-#                         result = content['text']
-#                         logger.info(f"LLM response received in {time.time() - start_time:.2f}s")
-#                         return result
-            
-#             # Return empty string if response structure is unexpected
-#             logger.warning("Unexpected response format from LLM")
-#             return ""
-            
-#         except Exception as e:
-#             logger.error(f"Error processing text with LLM: {str(e)}")
-#             return f"Error: {str(e)}"
-
-#     async def process_stream(self, text: str) -> AsyncGenerator[str, None]:
-#         """
-#         Process text with the language model with streaming.
-        
-#         Args:
-#             text: Input text to be processed
-            
-#         Yields:
-#             str: Generated token chunks
-#         """
-#         start_time = time.time()
-#         logger.info(f"Processing input with LLM streaming: {text[:50]}...")
-        
-#         # Determine if it's a Llama-family model (Meta)
-#         is_llama_model = "llama" in self.model_id.lower() or "meta" in self.model_id.lower()
+    @staticmethod
+    def _text_chars(message) -> int:
+        return sum(len(block.get("text", "")) for block in message["content"])
+
+    def _trim_history(self):
+        """Drop turns older than the last max_turns once the history is too long, summarizing them in the background"""
+        keep = 2 * self.max_turns
+        if len(self.messages) <= keep:
+            return
+        if len(self.messages) <= 2 * keep and self.history_chars <= self.history_char_budget:
+            return
         
-#         try:
-#             if is_llama_model:
-#                 # Llama models use a different payload format
-#                 system_prompt = self.system_prompt
-#                 payload = {
-#                     "prompt": f"{system_prompt}\n\n{self.conversation_history}\nAssistant: {text}",
-#                     "max_gen_len": 512,
-#                     "temperature": 0.7,
-#                     "top_p": 0.9
-#                 }
-                
-#                 # Stream response from Bedrock
-#                 response_stream = self.llm.invoke_model_with_response_stream(
-#                     modelId=self.model_id,
-#                     body=json.dumps(payload)
-#                 )
-                
-#                 # Process the streaming response
-#                 stream = response_stream.get('body')
-#                 if not stream:
-#                     logger.error("No stream found in response")
-#                     yield "Error: No response stream available"
-#                     return
-                    
-#                 for event in stream:
-#                     if 'chunk' in event:
-#                         chunk = event['chunk']
-#                         if 'bytes' in chunk:
-#                             try:
-#                                 chunk_data = json.loads(chunk['bytes'].decode())
-                                
-#                                 if 'generation' in chunk_data:
-#                                     token = chunk_data['generation']
-#                                     logger.debug(f"Received token: {token}")
-#                                     yield token
-#                             except Exception as e:
-#                                 logger.error(f"Error parsing chunk: {e}")
-#             else:
-#                 # For Claude and other models
-#                 response_stream = self.llm.converse_stream(
-#                     modelId=self.model_id,
-#                     messages=[{"role": "user", "content": [{"text": text}]}]
-#                 )
-                
-#                 for event in response_stream:
-#                     if 'chunk' in event:
-#                         chunk = event['chunk']
-#                         if 'message' in chunk:
-#                             message = chunk['message']
-#                             if message and 'content' in message and message['content']:
-#                                 for content_item in message['content']:
-#                                     if 'text' in content_item:
-#                                         text = content_item['text']
-#                                         if text:
-#                                             logger.debug(f"Received token: {text}")
-#                                             yield text
-            
-#             logger.info(f"LLM streaming completed in {time.time() - start_time:.2f}s")
-            
-#         except Exception as e:
-#             logger.error(f"Error processing text stream with LLM: {str(e)}")
-#             yield f"Error: {str(e)}"
+        old, recent = self.messages[:-keep], self.messages[-keep:]
+        self.messages = recent
+        self.history_chars = sum(self._text_chars(m) for m in recent)
+        # One summary at a time; turns trimmed while one is running just go unsummarized
+        if self.pending_summary is None:
+            dialogue = "\n".join(
+                f"{m['role']}: {block['text']}" for m in old for block in m["content"] if "text" in block
+            )
+            self.pending_summary = self.summary_executor.submit(self._summarize, dialogue)
+
+    def _summarize(self, dialogue: str):
+        try:
+            response = self.llm.converse(
+                modelId=self.model_id,
+                messages=[{"role": "user", "content": [{"text": SUMMARY_PROMPT + dialogue}]}],
+            )
+            return response["output"]["message"]["content"][0]["text"]
+        except Exception:
+            # Dropping the old turns still bounds the prompt; the summary is best effort
+            return None
+
+    def _apply_summary(self):
+        """Fold a finished background summary into the history; never waits for one still running"""
+        if self.pending_summary is None or not self.pending_summary.done():
+            return
+        summary = self.pending_summary.result()
+        self.pending_summary = None
+        # The history starts with a user turn, so the summary rides along in it to keep roles alternating
+        if summary and self.messages and self.messages[0]["role"] == "user":
+            first = self.messages[0]
+            self.messages[0] = {"role": "user", "content": [{"text": f"[prior summary] {summary}"}] + first["content"]}
+            self.history_chars += len(summary)
@@ -1,26 +1,47 @@
-import json
-import boto3
+import asyncio
+import orjson
+from services.aws_clients import get_aio_session
 from logger.logger_config import logger
 
+# SNS accepts at most 10 entries per publish_batch request
+SNS_MAX_BATCH = 10
+
 class SnsPublisher:
     def __init__(self,configloader):
         self.sns_topic_arn = configloader.get('aws', 'aws_sns_topic_arn')
         self.aws_access_key_id = configloader.get('aws','aws_access_key_id')
         self.aws_secret_access_key = configloader.get('aws','aws_secret_access_key')
         self.aws_region = configloader.get('aws',"aws_region")
-        try:
-            self.sns_client=boto3.client(
-                'sns',
-                aws_access_key_id=self.aws_access_key_id,
-                aws_secret_access_key=self.aws_secret_access_key,
-                region_name=self.aws_region
-            )
-        except Exception as e:
-            logger.error("              --------------- SNS Client not made")
+        # The async SNS client is created on first publish, inside the running event loop
+        self.session = get_aio_session()
+        self.client_context = None
+        self.sns_client = None
+        self.client_lock = asyncio.Lock()
+
+    async def get_client(self):
+        async with self.client_lock:
+            if self.sns_client is None:
+                try:
+                    self.client_context = self.session.create_client(
+                        'sns',
+                        aws_access_key_id=self.aws_access_key_id,
+                        aws_secret_access_key=self.aws_secret_access_key,
+                        region_name=self.aws_region
+                    )
+                    self.sns_client = await self.client_context.__aenter__()
+                except Exception as e:
+                    logger.error(f"              --------------- SNS Client not made: {e}")
+                    raise
+            return self.sns_client
+
+    def serialize(self, message_payload):
+        return orjson.dumps(message_payload).decode()
+
     async def publish(self,message_payload):
         try:
-            message_json = json.dumps(message_payload)
-            response = self.sns_client.publish(
+            message_json = self.serialize(message_payload)
+            sns_client = await self.get_client()
+            response = await sns_client.publish(
                 TopicArn=self.sns_topic_arn,
                 Message=message_json
             )
@@ -29,3 +50,118 @@ class SnsPublisher:
         
         except Exception as e:
             logger.error(f"Unable to publish message on SNS topic due to {e}")
+
+    async def close(self):
+        """Close the SNS client and its connection pool"""
+        if self.client_context is not None:
+            await self.client_context.__aexit__(None, None, None)
+            self.client_context = None
+            self.sns_client = None
+
+
+class BatchedSnsPublisher(SnsPublisher):
+    """
+    SnsPublisher that coalesces concurrent publishes into publish_batch requests.
+    Callers still await publish(payload) and get their own result back. A publish
+    made while nothing else is pending goes out on its own, so a lone message never
+    waits for the batching window.
+    """
+    def __init__(self, configloader, max_batch=SNS_MAX_BATCH, max_wait=0.02, queue_size=1000):
+        super().__init__(configloader)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.in_flight = 0
+        self.worker = None
+
+    async def publish(self, message_payload):
+        if self.in_flight == 0 and self.queue.empty():
+            self.in_flight += 1
+            try:
+                return await super().publish(message_payload)
+            finally:
+                self.in_flight -= 1
+        
+        try:
+            message_json = self.serialize(message_payload)
+        except Exception as e:
+            logger.error(f"Unable to publish message on SNS topic due to {e}")
+            return None
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self._drain())
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((message_json, future))
+        return await future
+
+    async def _drain(self):
+        """Collect up to max_batch queued messages, waiting at most max_wait after the first"""
+        loop = asyncio.get_running_loop()
+        batch = []
+        try:
+            while True:
+                batch = [await self.queue.get()]
+                deadline = loop.time() + self.max_wait
+                while len(batch) < self.max_batch:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+                self.in_flight += 1
+                try:
+                    await self._publish_batch(batch)
+                finally:
+                    self.in_flight -= 1
+        finally:
+            # Only reached when close() cancels us mid-batch
+            self._resolve_unpublished(batch)
+
+    @staticmethod
+    def _resolve_unpublished(batch):
+        """Resolve futures that will never be published to None, as a failed publish would"""
+        for _, future in batch:
+            if not future.done():
+                future.set_result(None)
+
+    async def _publish_batch(self, batch):
+        entries = [{"Id": str(i), "Message": message_json} for i, (message_json, _) in enumerate(batch)]
+        try:
+            sns_client = await self.get_client()
+            response = await sns_client.publish_batch(
+                TopicArn=self.sns_topic_arn,
+                PublishBatchRequestEntries=entries
+            )
+            logger.info(f"Published batch of {len(batch)} messages on SNS topic")
+        except Exception as e:
+            logger.error(f"Unable to publish batch of {len(batch)} messages on SNS topic due to {e}")
+            response = {}
+        
+        for failed in response.get("Failed", []):
+            logger.error(f"Unable to publish message on SNS topic due to {failed.get('Code')}: {failed.get('Message')}")
+        # Successful entries are reshaped into a publish() response and failed ones resolve
+        # to None, so callers get the same result whichever path their message took
+        metadata = response.get("ResponseMetadata")
+        results = {}
+        for item in response.get("Successful", []):
+            result = {"MessageId": item["MessageId"], "ResponseMetadata": metadata}
+            if "SequenceNumber" in item:
+                result["SequenceNumber"] = item["SequenceNumber"]
+            results[item["Id"]] = result
+        for i, (_, future) in enumerate(batch):
+            if not future.done():
+                future.set_result(results.get(str(i)))
+
+    async def close(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            try:
+                await self.worker
+            except asyncio.CancelledError:
+                pass
+            self.worker = None
+        # Messages still queued will never be sent; don't leave their callers waiting
+        while not self.queue.empty():
+            self._resolve_unpublished([self.queue.get_nowait()])
+        await super().close()
@@ -1,7 +1,15 @@
+import asyncio
+
+from requests.adapters import HTTPAdapter
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
 from logger.logger_config import logger
 from twilio.base.exceptions import TwilioRestException
 
+# Dials and status fetches run in worker threads; the pool must cover them or connections are discarded
+TWILIO_POOL_SIZE = 20
+TWILIO_MAX_RETRIES = 3
+
 
 class TwilioService:
     def __init__(self,configloader):
@@ -11,7 +19,10 @@ class TwilioService:
         self.twilio_no = configloader.get('twilio', 'TWILIO_PHONE_NO')
 
         logger.info(f"Initializing Twilio service with SID: {self.account_sid[:5]}... and phone: {self.twilio_no}")
-        self.client = Client(self.account_sid, self.auth_token)
+        # One keep-alive session per service, sized for the concurrent requests the tasks make
+        http_client = TwilioHttpClient(pool_connections=True, max_retries=TWILIO_MAX_RETRIES)
+        http_client.session.mount("https://", HTTPAdapter(pool_maxsize=TWILIO_POOL_SIZE, max_retries=TWILIO_MAX_RETRIES))
+        self.client = Client(self.account_sid, self.auth_token, http_client=http_client)
  
     def initiate_call(self, to_number: str, websocket_url: str):
         try:
@@ -34,3 +45,10 @@ class TwilioService:
         except Exception as e:
             logger.error(f"Error initiating call: {str(e)}")
             raise
+
+    # The Twilio client is blocking, so async callers go through these to keep the event loop free
+    async def initiate_call_async(self, to_number: str, websocket_url: str):
+        return await asyncio.to_thread(self.initiate_call, to_number=to_number, websocket_url=websocket_url)
+
+    async def fetch_call_status(self, call_sid: str) -> str:
+        return await asyncio.to_thread(lambda: self.client.calls(call_sid).fetch().status)
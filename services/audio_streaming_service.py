@@ -4,13 +4,12 @@ Audio Streaming Service for AI Call System
 Handles streaming audio to Twilio WebSockets
 """
 
-import base64
-import json
 import logging
 import asyncio
-from typing import Dict, Optional, Any
+from typing import Optional, Any
 
 from memory.memory_c import MemoryC
+from utils.streaming import MEDIA_SUFFIX, buffered, build_media_prefix, encode_payload
 
 class AudioStreamingService:
     """Service for streaming audio to Twilio WebSockets"""
@@ -20,65 +19,40 @@ class AudioStreamingService:
         self.memory_c = memory_c
         self.logger = logger or logging.getLogger(__name__)
         
-    async def play_filler_audio(self, ws_id: str, active_connections: Dict, stream_sids: Dict, state: int = None):
+    async def play_filler_audio(self, ws_id: str, client_ws: Any, stream_sid: Optional[str], state: int = None):
         """Play a filler audio while processing, using state-specific filler if available"""
         try:
-            # Get appropriate filler audio based on state
-            if state is not None:
-                filler_audio = self.memory_c.get_state_filler_audio(state)
-            else:
-                filler_audio = self.memory_c.get_random_filler_audio()
+            # Get the pre-encoded filler payload based on state
+            filler_media_tail = self.memory_c.get_filler_media_tail(state)
                 
-            if not filler_audio:
+            if not filler_media_tail:
                 self.logger.warning(f"No filler audio available for {ws_id}")
                 return
-                
-            # Convert to base64 and stream
-            filler_base64 = base64.b64encode(filler_audio).decode('utf-8')
-            
-            # Create media message
-            media_message = {
-                "event": "media",
-                "streamSid": stream_sids.get(ws_id),
-                "media": {
-                    "payload": filler_base64
-                }
-            }
             
-            # Send to websocket
-            client_ws = active_connections.get(ws_id)
+            # Send to websocket (only the stream's envelope prefix is added per playback)
             if client_ws:
-                await client_ws.send(json.dumps(media_message))
+                await client_ws.send(build_media_prefix(stream_sid) + filler_media_tail)
                 self.logger.info(f"Played filler audio for {ws_id}" + (f" (state {state})" if state else ""))
         except Exception as e:
             self.logger.error(f"Error playing filler audio: {e}")
 
-    async def stream_audio(self, ws_id: str, audio_data: bytes, active_connections: Dict, stream_sids: Dict):
+    async def stream_audio(self, ws_id: str, audio_data: bytes, client_ws: Any, stream_sid: Optional[str]):
         """Stream pre-generated audio to Twilio"""
         try:
-            if ws_id not in active_connections:
+            if not client_ws:
                 self.logger.error(f"INTERRUPTION_DEBUG: Cannot stream audio - connection not active for {ws_id}")
                 return
                 
-            if ws_id not in stream_sids:
+            if not stream_sid:
                 self.logger.error(f"INTERRUPTION_DEBUG: Cannot stream audio - stream SID not found for {ws_id}")
                 return
                 
-            # Convert to base64
-            audio_base64 = base64.b64encode(audio_data).decode('utf-8')
-            
-            # Create media message
-            media_message = {
-                "event": "media",
-                "streamSid": stream_sids.get(ws_id),
-                "media": {
-                    "payload": audio_base64
-                }
-            }
+            # Convert to base64 and splice it into the prebuilt media envelope
+            media_message = build_media_prefix(stream_sid) + encode_payload(audio_data) + MEDIA_SUFFIX
             
             # Send to websocket
             self.logger.info(f"INTERRUPTION_DEBUG: Sending {len(audio_data)} bytes of audio to WebSocket for {ws_id}")
-            await active_connections[ws_id].send(json.dumps(media_message))
+            await client_ws.send(media_message)
             self.logger.info(f"INTERRUPTION_DEBUG: Successfully streamed {len(audio_data)} bytes of audio for {ws_id}")
             
         except Exception as e:
@@ -86,54 +60,44 @@ class AudioStreamingService:
             import traceback
             self.logger.error(traceback.format_exc())
 
-    async def stream_elevenlabs_audio(self, ws_id: str, text: str, active_connections: Dict, 
-                                     stream_sids: Dict, elevenlabs_service: Any, collect_audio: bool = False):
+    async def stream_elevenlabs_audio(self, ws_id: str, text: str, client_ws: Any, 
+                                     stream_sid: Optional[str], elevenlabs_service: Any, collect_audio: bool = False):
         """Stream audio directly from ElevenLabs to Twilio"""
         try:
-            if ws_id not in active_connections:
+            if not client_ws:
                 self.logger.warning(f"Cannot stream audio - connection not active for {ws_id}")
                 return None if collect_audio else False
             
             # Debug: Log the stream SID
-            self.logger.info(f"Stream SID for {ws_id} is {stream_sids.get(ws_id)}")
+            self.logger.info(f"Stream SID for {ws_id} is {stream_sid}")
             
             # Temporarily allow streaming even if stream SID is None for debugging
-            if not stream_sids.get(ws_id):
+            if not stream_sid:
                 self.logger.warning(f"Stream SID is None for {ws_id}, but continuing for debugging")
             
             self.logger.info(f"Streaming audio for text: {text[:30]}...")
             
-            # Initialize audio buffer if collecting
-            audio_buffer = bytearray() if collect_audio else None
+            # Keep the raw chunks if collecting; they are joined once at the end
+            audio_chunks = [] if collect_audio else None
             
-            # Get audio chunks from ElevenLabs and stream directly to Twilio
+            # Get audio chunks from ElevenLabs and stream directly to Twilio, sending
+            # whatever has accumulated while the previous batch was being written
+            media_prefix = build_media_prefix(stream_sid)
             chunk_count = 0
-            async for chunk in elevenlabs_service.text_to_speech(text):
-                # Store chunk in buffer if collecting
+            async for batch in buffered(elevenlabs_service.text_to_speech(text), batch=True, timeout=15.0, first_timeout=60.0):
+                # Store chunks in buffer if collecting
                 if collect_audio:
-                    # Need to decode from base64 first since chunks are base64 encoded
-                    audio_buffer.extend(base64.b64decode(chunk))
-                
-                # Convert chunk to base64
-                chunk_base64 = chunk  # Already base64 encoded by ElevenLabs service
-                
-                # Create media message
-                media_message = {
-                    "event": "media",
-                    "streamSid": stream_sids.get(ws_id),
-                    "media": {
-                        "payload": chunk_base64
-                    }
-                }
+                    audio_chunks.extend(batch)
                 
-                # Send to websocket
-                await active_connections[ws_id].send(json.dumps(media_message))
-                chunk_count += 1
+                # Coalesce everything that is ready into one media message; Twilio accepts any
+                # payload length, so small ElevenLabs chunks don't each cost a frame
+                await client_ws.send(media_prefix + encode_payload(b"".join(batch)) + MEDIA_SUFFIX)
+                chunk_count += len(batch)
                 
             self.logger.info(f"Streamed {chunk_count} chunks of audio for {ws_id}")
             
             # Return the collected audio if requested, otherwise return success flag
-            return audio_buffer if collect_audio else True
+            return b"".join(audio_chunks) if collect_audio else True
             
         except Exception as e:
             self.logger.error(f"Error streaming ElevenLabs audio: {e}")
@@ -0,0 +1,40 @@
+from functools import lru_cache
+
+import boto3
+from aiobotocore.session import AioSession
+from botocore.config import Config
+
+# Keep pooled connections alive between requests and back off adaptively when throttled
+CLIENT_CONFIG = Config(
+    max_pool_connections=64,
+    tcp_keepalive=True,
+    connect_timeout=2,
+    read_timeout=30,
+    retries={"mode": "adaptive", "max_attempts": 5}
+)
+
+
+@lru_cache(maxsize=None)
+def get_client(service_name: str, region_name: str, aws_access_key_id: str, aws_secret_access_key: str):
+    """
+    Return the shared boto3 client for a service and set of credentials.
+    boto3 clients are thread-safe, so every caller reuses one client and its
+    connection pool instead of paying a new TCP/TLS handshake.
+    """
+    return boto3.client(
+        service_name,
+        region_name=region_name,
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key,
+        config=CLIENT_CONFIG
+    )
+
+
+def get_bedrock(region_name: str, aws_access_key_id: str, aws_secret_access_key: str):
+    return get_client("bedrock-runtime", region_name, aws_access_key_id, aws_secret_access_key)
+
+
+@lru_cache(maxsize=1)
+def get_aio_session() -> AioSession:
+    """Return the aiobotocore session shared by the SQS tasks"""
+    return AioSession()
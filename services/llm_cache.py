@@ -0,0 +1,40 @@
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+
+class ExactCache:
+    """
+    LRU cache of LLM responses keyed by a digest of the full request text.
+    Only meant for self-contained prompts whose answer does not depend on earlier turns.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.responses = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*parts: str) -> bytes:
+        # Whitespace-only differences (e.g. prompt indentation) map to the same entry
+        canonical = "\0".join(" ".join(part.split()) for part in parts)
+        return hashlib.blake2b(canonical.encode(), digest_size=16).digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        response = self.responses.get(key)
+        if response is None:
+            self.misses += 1
+            return None
+        self.responses.move_to_end(key)
+        self.hits += 1
+        return response
+
+    def put(self, key: bytes, response: str) -> None:
+        self.responses[key] = response
+        self.responses.move_to_end(key)
+        if len(self.responses) > self.maxsize:
+            self.responses.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self.responses)
@@ -1,9 +1,9 @@
 from logger.logger_config import logger
 from services.Twilio_service import TwilioService
 import asyncio
-from aiobotocore.session import AioSession
-import ast
+from services.aws_clients import get_aio_session
 from utils.validators import validate_phone_no
+from tasks.poll_queue import SQS_CLIENT_CONFIG, SQS_MAX_BATCH
 
 async def call_status_check(shared_data,call_status_mapping,configloader,queue_messages,dup_set):
     aws_region = configloader.get('aws', 'aws_region')
@@ -11,57 +11,61 @@ async def call_status_check(shared_data,call_status_mapping,configloader,queue_m
     aws_secret_access_key =  configloader.get('aws', 'aws_secret_access_key')
     queue_url = configloader.get('aws', 'queue_url')
     websocket_url = configloader.get('twilio', 'WEBSOCKET_URL')
-    session = AioSession()
+    session = get_aio_session()
     twilio_service = TwilioService(configloader=configloader)
 
 
-    async def delete_from_queue(message_id):
-        try:
-            async with session.create_client('sqs',region_name=aws_region,aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key) as client:
-                response = await client.receive_message(
-                    QueueUrl=queue_url,
-                    AttributeNames=['All'],
-                    MaxNumberOfMessages=1,  
-                    WaitTimeSeconds=20,
-                    VisibilityTimeout=0,
-                )
-                
-                messages = response.get('Messages', [])
-                logger.info(messages)
-                
-                if messages:
-                    for message in messages:
-                        whole_message_dict = ast.literal_eval(message['Body'])
-                        if message_id == whole_message_dict["MessageId"]:
-                            logger.info("Got that the message has ended , Deleting message from Queue")
-                            await client.delete_message(QueueUrl=queue_url,ReceiptHandle=message['ReceiptHandle'])
-        except Exception as e:
-            logger.error(f"Error in deleting the message from queue : {e}")
+    async def delete_from_queue(client, message_ids):
+        # poll_queue recorded each message's receipt handle, so no receive is needed to delete it
+        receipt_handles = queue_messages["receipt_handles"]
+        handles = [receipt_handles.pop(message_id) for message_id in message_ids if message_id in receipt_handles]
+        for start in range(0, len(handles), SQS_MAX_BATCH):
+            entries = [{'Id': str(i), 'ReceiptHandle': handle} for i, handle in enumerate(handles[start:start + SQS_MAX_BATCH])]
+            try:
+                logger.info(f"Got that {len(entries)} message(s) have ended , Deleting them from Queue")
+                result = await client.delete_message_batch(QueueUrl=queue_url, Entries=entries)
+                for failed in result.get('Failed', []):
+                    logger.warning(f"Batch delete failed for entry {failed['Id']}: {failed.get('Message')}, retrying individually")
+                    await client.delete_message(QueueUrl=queue_url, ReceiptHandle=entries[int(failed['Id'])]['ReceiptHandle'])
+            except Exception as e:
+                logger.error(f"Error in deleting the message from queue : {e}")
 
-    while True:
+    # One client for the whole task, so the SQS connection pool is reused across deletions
+    async with session.create_client('sqs',region_name=aws_region,aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key,config=SQS_CLIENT_CONFIG) as client:
+        while True:
 
+            ended_message_ids = set()
+            in_call = []
 
-        for message in queue_messages["message_list"]:
+            for message in queue_messages["message_list"]:
 
-            shared_data_match = next((item for item in shared_data["call_instance_list"] if item["message_id"] == message["MessageId"]),None)
-            
+                shared_data_match = shared_data["call_instance_by_message_id"].get(message["MessageId"])
 
-            if shared_data_match is not None:
-                # we just print the call
-                call_status = twilio_service.client.calls(shared_data_match["call_sid"]).fetch().status
+                if shared_data_match is not None:
+                    in_call.append((message, shared_data_match["call_sid"]))
+                else:
+                    logger.info(f"Found {message} in queue_message but not in shared_data, This happens when it is removed with websockthandler possibly when call has ended")
+                    ended_message_ids.add(message["MessageId"])
+
+            # All status requests for this tick run concurrently, each in a worker thread
+            statuses = await asyncio.gather(*(twilio_service.fetch_call_status(call_sid) for _, call_sid in in_call), return_exceptions=True)
+
+            for (message, call_sid), call_status in zip(in_call, statuses):
+                if isinstance(call_status, Exception):
+                    logger.error(f"Error fetching status of call {call_sid}: {call_status}")
+                    continue
                 logger.info(f"Call status is {call_status}")
-                
+
                 # if call status is ended in any way we delete it from aws queue.
                 if call_status_mapping.get(call_status) in [0,1,2,3,4]:
                     logger.info("Call has ended and we can stop the task for now")
-                    delete_from_queue(message_id=message["MessageId"])
-                    queue_messages["message_list"].remove(message)
-                    logger.info(queue_messages["message_list"])
-                    
-            else:
-                logger.info(f"Found {message} in queue_message but not in shared_data, This happens when it is removed with websockthandler possibly when call has ended")
-                await delete_from_queue(message_id=message["MessageId"])
-                queue_messages["message_list"].remove(message)
+                    ended_message_ids.add(message["MessageId"])
 
-        await asyncio.sleep(2)
+            if ended_message_ids:
+                # Drop ended messages in one pass rather than removing them while iterating
+                queue_messages["message_list"] = [m for m in queue_messages["message_list"] if m["MessageId"] not in ended_message_ids]
+                queue_messages["message_ids"] -= ended_message_ids
+                logger.info(queue_messages["message_list"])
+                await delete_from_queue(client, ended_message_ids)
 
+            await asyncio.sleep(2)
@@ -1,10 +1,35 @@
 from logger.logger_config import logger
 from services.Twilio_service import TwilioService
-from aiobotocore.session import AioSession
+from services.aws_clients import get_aio_session
+from aiobotocore.config import AioConfig
 import ast
 import asyncio
+import orjson
 from utils.validators import validate_phone_no
 
+# The read timeout has to outlast the 20s long poll; pooled connections are kept alive between polls
+SQS_CLIENT_CONFIG = AioConfig(
+    connect_timeout=5,
+    read_timeout=25,
+    max_pool_connections=50,
+    tcp_keepalive=True,
+    retries={'max_attempts': 3, 'mode': 'adaptive'}
+)
+
+# Upper bound on Twilio call requests in flight at once
+MAX_CONCURRENT_DIALS = 10
+# Messages stay hidden while their call runs; a longer call gets the message redelivered
+VISIBILITY_TIMEOUT = 300
+# Largest batch SQS accepts in delete_message_batch
+SQS_MAX_BATCH = 10
+
+
+def parse_message_body(body):
+    """Parse an SQS/SNS message body; bodies are JSON, older Python-repr payloads fall back to literal_eval"""
+    try:
+        return orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return ast.literal_eval(body)
 
 async def poll_queue(configloader,shared_data,queue_messages,dup_set):
     queue_url = configloader.get('aws', 'queue_url')
@@ -12,24 +37,43 @@ async def poll_queue(configloader,shared_data,queue_messages,dup_set):
     aws_region = configloader.get('aws', 'aws_region')
     aws_access_key_id = configloader.get('aws', 'aws_access_key_id')
     aws_secret_access_key =  configloader.get('aws', 'aws_secret_access_key')
-    queue_url = configloader.get('aws', 'queue_url')
 
     twilio_service = TwilioService(configloader=configloader)
     
     logger.info("Task for Poll queue for messages is started")
 
-    session = AioSession()
+    dial_semaphore = asyncio.Semaphore(MAX_CONCURRENT_DIALS)
+    dial_tasks = set()
+
+    async def dial(whole_message_dict, message_dict, phone_no):
+        async with dial_semaphore:
+            try:
+                call = await twilio_service.initiate_call_async(to_number=phone_no, websocket_url=websocket_url)
+            except Exception as e:
+                logger.error(f"Error initiating call to {phone_no}: {e}")
+                # Without a shared_data entry, call_status_check deletes the message from the queue
+                queue_messages["message_list"].append(whole_message_dict)
+                return
+        message_dict["call_sid"] = call.sid
+        logger.info(f"Call Sid  is {call.sid}")
+        logger.info(f"{message_dict} is the incoming dict and it seems valid")
+        # Both lists are updated together so call_status_check never sees one without the other
+        queue_messages["message_list"].append(whole_message_dict)
+        shared_data["call_instance_list"].append(message_dict)
+        shared_data["call_instance_by_message_id"][message_dict["message_id"]] = message_dict
+
+    session = get_aio_session()
 
-    async with session.create_client('sqs',region_name=aws_region,aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key) as client:
+    async with session.create_client('sqs',region_name=aws_region,aws_access_key_id=aws_access_key_id,aws_secret_access_key=aws_secret_access_key,config=SQS_CLIENT_CONFIG) as client:
         while True:
             try:
                 
                 response = await client.receive_message(
                     QueueUrl=queue_url,
                     AttributeNames=['All'],
-                    MaxNumberOfMessages=1,  
+                    MaxNumberOfMessages=10,  
                     WaitTimeSeconds=20,
-                    VisibilityTimeout=1,
+                    VisibilityTimeout=VISIBILITY_TIMEOUT,
                 )                
                 messages = response.get('Messages', [])
                 
@@ -40,43 +84,67 @@ async def poll_queue(configloader,shared_data,queue_messages,dup_set):
 
                     for message in messages:
                         #triger starting call status checking code every second and check for uniqe message . 
-                        if message['Body'] in dup_set:
+                        if not dup_set.check_and_add(message['Body']):
+                            # Redelivered while its call is still running; only the newest receipt handle can delete it
+                            # A malformed body would fail here on every redelivery, so skip it rather than abort the batch
+                            try:
+                                message_id = parse_message_body(message['Body']).get("MessageId")
+                            except Exception as e:
+                                logger.warning(f"Skipping redelivered message with unparseable body: {e}")
+                                continue
+                            if message_id in queue_messages["receipt_handles"]:
+                                queue_messages["receipt_handles"][message_id] = message['ReceiptHandle']
                             continue
-                        dup_set.add(message['Body'])
                         
-                        whole_message_dict = ast.literal_eval(message['Body'])
+                        whole_message_dict = None
+                        # One bad message must not abort the rest of the batch or stay claimed forever
+                        try:
+                            whole_message_dict = parse_message_body(message['Body'])
 
-                        # this is ongoing call and we wont delete it until call has ended
-                        if whole_message_dict in queue_messages["message_list"]:
-                            logger.info(f"the message is currently in call, Check for other message")
-                            continue
+                            # this is ongoing call and we wont delete it until call has ended
+                            if whole_message_dict["MessageId"] in queue_messages["message_ids"]:
+                                logger.info(f"the message is currently in call, Check for other message")
+                                continue
+                            # Claimed now so it is skipped while the dial is still in flight
+                            queue_messages["message_ids"].add(whole_message_dict["MessageId"])
                         
-                        # we store new call details with ourselves.
-                        logger.info(f"Received message: {whole_message_dict}")
+                            # we store new call details with ourselves.
+                            logger.info(f"Received message: {whole_message_dict}")
 
-                        queue_messages["message_list"].append(whole_message_dict)
-
-                        message_id = whole_message_dict["MessageId"]
-                        message_dict_rel = whole_message_dict['Message']
-                        logger.info(f"Message dict is : {message_dict_rel}")
-                        message_dict = ast.literal_eval(message_dict_rel)
+                            message_id = whole_message_dict["MessageId"]
+                            queue_messages["receipt_handles"][message_id] = message['ReceiptHandle']
+                            message_dict_rel = whole_message_dict['Message']
+                            logger.info(f"Message dict is : {message_dict_rel}")
+                            message_dict = parse_message_body(message_dict_rel)
                         
-                        phone_no = message_dict["mobileNumber"]
-                        logger.info(f"Phone no is {phone_no}")
-
-                        message_dict["message_id"] = message_id
-
-                        if validate_phone_no(phone_no=phone_no):
-                            # if validated , we make api  request for twilio to call interviwee
-                            call = twilio_service.initiate_call(to_number=phone_no,websocket_url=websocket_url)
-                            message_dict["call_sid"] = call.sid
-                            logger.info(f"Call Sid  is {call.sid}")
-                            logger.info(f"{message_dict} is the incoming dict and it seems valid")
-                            shared_data["call_instance_list"].append(message_dict)
+                            phone_no = message_dict["mobileNumber"]
+                            logger.info(f"Phone no is {phone_no}")
+
+                            message_dict["message_id"] = message_id
+
+                            if validate_phone_no(phone_no=phone_no):
+                                # if validated , we make api  request for twilio to call interviwee without waiting for it
+                                task = asyncio.create_task(dial(whole_message_dict, message_dict, phone_no))
+                                dial_tasks.add(task)
+                                task.add_done_callback(dial_tasks.discard)
                         
-                        else:
-                            logger.info("invalid phone number , Call is rejected. ")
-                            message_dict["call_sid"] = "call.sid"
+                            else:
+                                logger.info("invalid phone number , Call is rejected. ")
+                                message_dict["call_sid"] = "call.sid"
+                                queue_messages["message_list"].append(whole_message_dict)
+                        except Exception as e:
+                            logger.error(f"Error processing message from queue, releasing it: {e}")
+                            if isinstance(whole_message_dict, dict) and "MessageId" in whole_message_dict:
+                                # Without a shared_data entry, call_status_check deletes it like a rejected number
+                                queue_messages["message_ids"].add(whole_message_dict["MessageId"])
+                                queue_messages["receipt_handles"][whole_message_dict["MessageId"]] = message['ReceiptHandle']
+                                queue_messages["message_list"].append(whole_message_dict)
+                            else:
+                                # No MessageId to track it by, so delete it here
+                                try:
+                                    await client.delete_message(QueueUrl=queue_url, ReceiptHandle=message['ReceiptHandle'])
+                                except Exception as delete_error:
+                                    logger.error(f"Error deleting unparseable message from queue: {delete_error}")
                         
                         
                 else:
@@ -85,6 +153,5 @@ async def poll_queue(configloader,shared_data,queue_messages,dup_set):
 
             except Exception as e:
                 logger.error(f"Error in Poll queue {e}")
-            
-            finally:
+                # Long polling already paces the loop; only back off after a failure
                 await asyncio.sleep(10)
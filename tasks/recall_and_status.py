@@ -8,23 +8,38 @@ import asyncio
 async def recall_and_status(shared_data,call_status_mapping,configloader):
     twilio_no = configloader.get('twilio', 'TWILIO_PHONE_NO')
     websocket_url = configloader.get('twilio', 'WEBSOCKET_URL')
+    twilio_service = TwilioService(configloader=configloader)
+    loop = asyncio.get_running_loop()
     
     while True:
+        # Ticks are a fixed 60s apart however long the Twilio requests take, so wait_n_mins stays in minutes
+        next_tick = loop.time() + 60
         try:
-            call_instance = shared_data["call_instance_list"]
+            call_instance = list(shared_data["call_instance_list"])
             logger.info(f"The recheck call demonstates following data gathered : {call_instance}")
+
+            # Fetch every status concurrently instead of one blocking request after another
+            statuses = await asyncio.gather(*(twilio_service.fetch_call_status(instance["call_sid"]) for instance in call_instance), return_exceptions=True)
     
-            for instance in shared_data["call_instance_list"]:
+            completed = set()
+            for instance, call_status in zip(call_instance, statuses):
+                # One failed lookup only skips that call for this tick
+                if isinstance(call_status, Exception):
+                    logger.error(f"Error fetching status of call {instance['call_sid']}: {call_status}")
+                    continue
                 
-                twilio_service = TwilioService(configloader=configloader)
-                call_status = twilio_service.client.calls(instance["call_sid"]).fetch().status
                 logger.info(f"call status is {call_status}")
+
+                # A completed call is never recalled, so it leaves the working set instead of being fetched every cycle
+                if call_status_mapping.get(call_status) == 1:
+                    completed.add(instance["call_sid"])
+                    continue
     
                 if call_status_mapping.get(call_status) in [0,2,3,4,5] :
         
                     if instance["wait_n_mins"] == 0:
         
-                        call= twilio_service.initiate_call(to_number = instance["mobileNumber"], websocket_url=websocket_url)
+                        call= await twilio_service.initiate_call_async(to_number = instance["mobileNumber"], websocket_url=websocket_url)
                         instance["call_sid"] = call.sid
                         instance["wait_n_mins"] = 3
                         mobile_no = instance["mobileNumber"]
@@ -33,8 +48,15 @@ async def recall_and_status(shared_data,call_status_mapping,configloader):
                     else:
                         instance["wait_n_mins"] -= 1
 
+            if completed:
+                shared_data["call_instance_list"] = [instance for instance in shared_data["call_instance_list"] if instance["call_sid"] not in completed]
+                by_message_id = shared_data["call_instance_by_message_id"]
+                for instance in call_instance:
+                    if instance["call_sid"] in completed:
+                        by_message_id.pop(instance["message_id"], None)
+
         except Exception as e:
             logger.error(f"Error in recall specifically {e}. ")
         
         finally:
-            await asyncio.sleep(60)
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
@@ -5,6 +5,7 @@ import time
 import configparser
 import logging
 import json
+import orjson
 from typing import List, Dict, Optional, AsyncGenerator
 
 # Add root directory to path to import from parent directories
@@ -13,7 +14,8 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 # Import ElevenLabs service
 from services.Elevenlabs import ElevenLabsService
-import boto3
+from services.aws_clients import get_bedrock
+from services.LLM_agent import load_system_prompt
 
 # Configure logging
 logging.basicConfig(
@@ -30,6 +32,10 @@ TEST_PROMPTS = [
     "Generate a question about someone's recent project. Max 15 words.",
 ]
 
+# Tokens are sent to ElevenLabs as phrases: flushed at punctuation or once this long
+PHRASE_BOUNDARIES = ".?!,"
+MAX_PHRASE_CHARS = 40
+
 class StreamingLLM:
     """LLM with token streaming support using AWS Bedrock"""
     
@@ -39,17 +45,12 @@ class StreamingLLM:
         self.aws_secret_access_key = config.get('aws', 'aws_secret_access_key')
         self.model_id = config.get('llm', 'model_id')
         
-        self.client = boto3.client(
-            "bedrock-runtime",
-            region_name=self.aws_region,
-            aws_access_key_id=self.aws_access_key_id,
-            aws_secret_access_key=self.aws_secret_access_key
-        )
+        # Shared with every other user of these credentials, so the client and its pool are built once
+        self.client = get_bedrock(self.aws_region, self.aws_access_key_id, self.aws_secret_access_key)
         
-        # Load system prompt
+        # Load system prompt (read once per process and shared with LanguageModelProcessor)
         try:
-            with open('system_prompt.txt', 'r') as file:
-                self.system_prompt = file.read().strip()
+            self.system_prompt = load_system_prompt()
         except Exception as e:
             logger.warning(f"Could not load system prompt: {e}")
             self.system_prompt = "You are a helpful assistant."
@@ -87,16 +88,13 @@ class StreamingLLM:
                     chunk = event['chunk']
                     if 'bytes' in chunk:
                         try:
-                            chunk_data = json.loads(chunk['bytes'].decode())
+                            chunk_data = orjson.loads(chunk['bytes'])
                             
                             if 'generation' in chunk_data:
                                 token = chunk_data['generation']
                                 logger.info(f"Received token chunk: {token}")
                                 token_counter += 1
                                 yield token
-                                
-                                # Small delay between tokens to simulate real-time streaming
-                                await asyncio.sleep(0.05)
                         except Exception as e:
                             logger.error(f"Error parsing chunk: {e}")
             
@@ -132,28 +130,21 @@ async def test_llm_token_streaming():
         first_audio_time = None
         tokens_processed = 0
         
-        # Token buffer for streaming
+        # Full response for the summary, and the phrase not yet sent to ElevenLabs
         token_buffer = ""
+        pending = ""
         
-        # Process tokens as they arrive from LLM
-        async for token in llm.generate_tokens(prompt):
-            # Record first token timing
-            if tokens_processed == 0:
-                first_token_time = time.time()
-                logger.info(f"First token received after {first_token_time - start_time:.3f}s")
-            
-            tokens_processed += 1
-            token_buffer += token
-            
-            # Get streaming audio for accumulated tokens
-            logger.info(f"Sending to ElevenLabs: '{token_buffer.strip()}'")
+        async def speak(phrase):
+            nonlocal first_audio_time
+            # Only the new phrase is sent, never the text that already has audio
+            logger.info(f"Sending to ElevenLabs: '{phrase}'")
             
             # Get timing for audio generation
             token_send_time = time.time()
             
             # Process audio response
             audio_chunks = []
-            async for audio_chunk in eleven_labs.text_to_speech(token_buffer.strip()):
+            async for audio_chunk in eleven_labs.text_to_speech(phrase):
                 # Store first audio chunk time if not already set
                 if not first_audio_time and len(audio_chunks) == 0:
                     first_audio_time = time.time()
@@ -167,6 +158,26 @@ async def test_llm_token_streaming():
             audio_complete_time = time.time()
             logger.info(f"Audio for batch received in {audio_complete_time - token_send_time:.3f}s")
         
+        # Process tokens as they arrive from LLM
+        async for token in llm.generate_tokens(prompt):
+            # Record first token timing
+            if tokens_processed == 0:
+                first_token_time = time.time()
+                logger.info(f"First token received after {first_token_time - start_time:.3f}s")
+            
+            tokens_processed += 1
+            token_buffer += token
+            pending += token
+            
+            if pending.rstrip().endswith(tuple(PHRASE_BOUNDARIES)) or len(pending) >= MAX_PHRASE_CHARS:
+                if pending.strip():
+                    await speak(pending.strip())
+                pending = ""
+        
+        # Whatever is left after the last boundary
+        if pending.strip():
+            await speak(pending.strip())
+        
         # Log overall timings
         end_time = time.time()
         logger.info(f"Generated response: '{token_buffer.strip()}'")
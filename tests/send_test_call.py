@@ -1,13 +1,17 @@
-import boto3
 import json
 import configparser
 import uuid
 import logging
 
+from services.aws_clients import get_client
+
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - [%(levelname)s|%(name)s] %(message)s')
 logger = logging.getLogger('send_test_call')
 
+# Largest batch SQS accepts in send_message_batch
+SQS_MAX_BATCH = 10
+
 class SqsPublisher:
     def __init__(self, configloader):
         self.queue_url = configloader.get('aws', 'queue_url')
@@ -15,34 +19,35 @@ class SqsPublisher:
         self.aws_secret_access_key = configloader.get('aws', 'aws_secret_access_key')
         self.aws_region = configloader.get('aws', 'aws_region')
         try:
-            self.sqs_client = boto3.client(
-                'sqs',
-                aws_access_key_id=self.aws_access_key_id,
-                aws_secret_access_key=self.aws_secret_access_key,
-                region_name=self.aws_region
-            )
+            # Shared client with keep-alive and adaptive retries, so repeated publishes reuse one connection
+            self.sqs_client = get_client('sqs', self.aws_region, self.aws_access_key_id, self.aws_secret_access_key)
         except Exception as e:
             logger.error(f"SQS Client initialization failed: {e}")
 
+    @staticmethod
+    def format_message(message_payload):
+        """Wrap a payload in an SNS notification envelope and return it as a JSON string"""
+        # Format the message to mimic SNS notification structure
+        # This is crucial for compatibility with poll_queue.py
+        message_id = str(uuid.uuid4())
+        sns_formatted_message = {
+            "Type": "Notification",
+            "MessageId": message_id,
+            "TopicArn": "dummy-topic-arn",  # Not used but included for format compatibility
+            "Message": json.dumps(message_payload),
+            "Timestamp": "2023-01-01T00:00:00.000Z",  # Dummy timestamp
+            "SignatureVersion": "1",
+            "Signature": "dummy-signature",  # Not used but included for format compatibility
+            "SigningCertURL": "dummy-cert-url",  # Not used but included for format compatibility
+            "UnsubscribeURL": "dummy-unsubscribe-url"  # Not used but included for format compatibility
+        }
+        
+        # Convert the entire SNS-formatted message to a JSON string
+        return json.dumps(sns_formatted_message)
+
     def publish(self, message_payload):
         try:
-            # Format the message to mimic SNS notification structure
-            # This is crucial for compatibility with poll_queue.py
-            message_id = str(uuid.uuid4())
-            sns_formatted_message = {
-                "Type": "Notification",
-                "MessageId": message_id,
-                "TopicArn": "dummy-topic-arn",  # Not used but included for format compatibility
-                "Message": json.dumps(message_payload),
-                "Timestamp": "2023-01-01T00:00:00.000Z",  # Dummy timestamp
-                "SignatureVersion": "1",
-                "Signature": "dummy-signature",  # Not used but included for format compatibility
-                "SigningCertURL": "dummy-cert-url",  # Not used but included for format compatibility
-                "UnsubscribeURL": "dummy-unsubscribe-url"  # Not used but included for format compatibility
-            }
-            
-            # Convert the entire SNS-formatted message to a JSON string
-            message_json = json.dumps(sns_formatted_message)
+            message_json = self.format_message(message_payload)
             logger.info(f"Publishing to SQS: {message_json}")
             
             # Send message to SQS
@@ -56,6 +61,22 @@ class SqsPublisher:
             logger.error(f"Unable to publish message to SQS queue due to: {e}")
             return None
 
+    def publish_batch(self, message_payloads):
+        """Publish many payloads with send_message_batch, up to 10 per request"""
+        responses = []
+        for start in range(0, len(message_payloads), SQS_MAX_BATCH):
+            chunk = message_payloads[start:start + SQS_MAX_BATCH]
+            entries = [{'Id': str(i), 'MessageBody': self.format_message(payload)} for i, payload in enumerate(chunk)]
+            try:
+                response = self.sqs_client.send_message_batch(QueueUrl=self.queue_url, Entries=entries)
+                for failed in response.get('Failed', []):
+                    logger.error(f"Failed to publish batch entry {failed['Id']}: {failed.get('Message')}")
+                logger.info(f"Published {len(response.get('Successful', []))}/{len(entries)} messages to SQS queue")
+                responses.append(response)
+            except Exception as e:
+                logger.error(f"Unable to publish message batch to SQS queue due to: {e}")
+        return responses
+
 def load_config():
     config = configparser.ConfigParser()
     config.read('config.ini')
@@ -2,6 +2,7 @@
 import asyncio
 import json
 import logging
+import orjson
 import sys
 import uuid
 import time
@@ -29,7 +30,7 @@ async def warm_up_llm(llm):
     start_time = time.time()
     
     try:
-        llm_response = llm.process(warm_up_prompt)
+        llm_response = await asyncio.to_thread(llm.process, warm_up_prompt)
         elapsed_time = time.time() - start_time
         logger.info(f"LLM warm-up complete in {elapsed_time:.2f} seconds")
         return True
@@ -37,6 +38,32 @@ async def warm_up_llm(llm):
         logger.warning(f"LLM warm-up failed: {str(e)}")
         return False
 
+def build_prompt_parts(question_data: Dict[str, Any]) -> Tuple[str, str]:
+    """Build the fixed text around the user's response once per question"""
+    response_categories = question_data.get("response_categories", {})
+    head = f"""State: {question_data['state']}
+Question: {question_data['question']}
+User response: """
+    
+    tail = """
+
+Analyze the user's response and determine which category it falls into. Categories:
+"""
+    tail += "".join(f"- {category}: {description}\n" for category, description in response_categories.items())
+
+    # Create category list as a string first
+    category_list = ', '.join(f'"{c}"' for c in response_categories)
+    
+    tail += f"""Provide your analysis in JSON format:
+{{
+  "response_type": [one of: {category_list}, or "default"],
+  "extracted_value": [extracted value if applicable],
+  "needs_followup": [true/false]
+}}
+
+IMPORTANT: Return ONLY valid JSON. Do not include any explanations, notes, or text outside the JSON structure."""
+    return head, tail
+
 async def process_with_llm(llm, prompt: str, max_retries: int = MAX_RETRIES) -> Tuple[bool, Optional[Dict[str, Any]], float]:
     """Process text with LLM with retry logic and timing"""
     retries = 0
@@ -44,7 +71,7 @@ async def process_with_llm(llm, prompt: str, max_retries: int = MAX_RETRIES) ->
     
     while retries < max_retries:
         try:
-            llm_response = llm.process(prompt)
+            llm_response = await asyncio.to_thread(llm.process, prompt)
             elapsed_time = time.time() - start_time
             
             # Extract JSON from response
@@ -54,9 +81,9 @@ async def process_with_llm(llm, prompt: str, max_retries: int = MAX_RETRIES) ->
             if json_start >= 0 and json_end > json_start:
                 try:
                     json_str = llm_response[json_start:json_end]
-                    analysis = json.loads(json_str)
+                    analysis = orjson.loads(json_str)
                     return True, analysis, elapsed_time
-                except json.JSONDecodeError:
+                except orjson.JSONDecodeError:
                     logger.warning(f"Failed to parse LLM response as JSON: {llm_response}")
                     retries += 1
             else:
@@ -90,11 +117,16 @@ async def test_memory_b_flow():
     with open('questions.json', 'r') as f:
         questions = json.load(f)
     
+    # Index questions by state once; the first entry for a state wins, as with a linear scan
+    by_state = {}
+    for q in questions:
+        by_state.setdefault(q["state"], q)
+    
     # Generate a test call SID
     call_sid = f"test_{uuid.uuid4().hex[:8]}"
     
     # Initialize conversation
-    await memory_b.initialize_conversation(call_sid, initial_state=0)
+    memory_b.initialize_conversation(call_sid, initial_state=0)
     logger.info(f"Initialized conversation with call_sid: {call_sid}")
     
     # Greeting
@@ -103,20 +135,21 @@ async def test_memory_b_flow():
     print("="*80)
     
     # Get initial response
-    user_input = input("You: ")
-    await memory_b.buffer_response(call_sid, user_input)
+    user_input = await asyncio.to_thread(input, "You: ")
+    memory_b.buffer_response(call_sid, user_input)
     
     # Process each question
     current_state = 1
+    prompt_parts = {}
     while current_state <= len(questions):
         # Get question data
-        question_data = next((q for q in questions if q["state"] == current_state), None)
+        question_data = by_state.get(current_state)
         if not question_data:
             logger.error(f"No question found for state {current_state}")
             break
             
         # Update state in Memory B
-        await memory_b.update_state(
+        memory_b.update_state(
             call_sid=call_sid,
             state_index=current_state,
             expected_output_type=question_data["expected_answer_type"],
@@ -131,32 +164,14 @@ async def test_memory_b_flow():
         print("-"*80)
         
         # Get user response
-        user_response = input("You: ")
-        await memory_b.buffer_response(call_sid, user_response)
-        
-        # Process response with LLM
-        response_categories = question_data.get("response_categories", {})
-
-        prompt = f"""State: {question_data['state']}
-Question: {question_data['question']}
-User response: {user_response}
-
-Analyze the user's response and determine which category it falls into. Categories:
-"""
-        for category, description in response_categories.items():
-            prompt += f"- {category}: {description}\n"
-
-        # Create category list as a string first
-        category_list = ', '.join([f'"{c}"' for c in response_categories.keys()])
+        user_response = await asyncio.to_thread(input, "You: ")
+        memory_b.buffer_response(call_sid, user_response)
         
-        prompt += f"""Provide your analysis in JSON format:
-{{
-  "response_type": [one of: {category_list}, or "default"],
-  "extracted_value": [extracted value if applicable],
-  "needs_followup": [true/false]
-}}
-
-IMPORTANT: Return ONLY valid JSON. Do not include any explanations, notes, or text outside the JSON structure."""
+        # Process response with LLM; only the user's response changes between prompts for a state
+        if current_state not in prompt_parts:
+            prompt_parts[current_state] = build_prompt_parts(question_data)
+        head, tail = prompt_parts[current_state]
+        prompt = head + user_response + tail
         
         # Process with LLM (with retry logic)
         success, analysis, elapsed_time = await process_with_llm(llm, prompt)
@@ -168,14 +183,14 @@ IMPORTANT: Return ONLY valid JSON. Do not include any explanations, notes, or te
             logger.info(f"LLM processing time: {elapsed_time:.2f} seconds")
             
             # Update memory with response type
-            await memory_b.update_state(
+            memory_b.update_state(
                 call_sid=call_sid,
                 response_type=response_type
             )
             
             # Store extracted value if present
             if extracted_value is not None:
-                await memory_b.set_extracted_value(call_sid, "value", str(extracted_value))
+                memory_b.set_extracted_value(call_sid, "value", str(extracted_value))
                 logger.info(f"Extracted value: {extracted_value}")
             
             # Check if follow-up is needed
@@ -193,11 +208,11 @@ IMPORTANT: Return ONLY valid JSON. Do not include any explanations, notes, or te
                 print("-"*80)
                 
                 # Get follow-up response
-                followup_response = input("You: ")
+                followup_response = await asyncio.to_thread(input, "You: ")
                 
                 # Add follow-up to memory
-                await memory_b.buffer_response(call_sid, followup_response)
-                await memory_b.add_followup_qa(call_sid, followup_text, followup_response)
+                memory_b.buffer_response(call_sid, followup_response)
+                memory_b.add_followup_qa(call_sid, followup_text, followup_response)
                 
                 # Process follow-up response with LLM if needed
                 if question_data.get("process_followup", False):
@@ -214,7 +229,7 @@ Analyze the user's response and provide your analysis in JSON format:
                     logger.info(f"Follow-up LLM processing time for state {current_state}: {followup_elapsed_time:.2f} seconds")
             
             # Debug info
-            state = await memory_b.get_state(call_sid)
+            state = memory_b.get_state(call_sid)
             logger.info(f"State {current_state} - Response type: {response_type}")
         else:
             logger.error("Failed to process response with LLM after multiple retries")
@@ -229,7 +244,7 @@ Analyze the user's response and provide your analysis in JSON format:
     print("="*80)
     
     # Clean up
-    await memory_b.clear_conversation(call_sid)
+    memory_b.clear_conversation(call_sid)
     logger.info("Conversation completed")
 
 if __name__ == "__main__":
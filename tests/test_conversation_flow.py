@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
+import argparse
 import asyncio
 import json
 import logging
 import sys
 import os
 import uuid
+import orjson
 from typing import Dict, Any, List, Optional, Tuple
 
 # Configure logging
@@ -21,6 +23,63 @@ from memory.memory_a import MemoryA
 from memory.memory_b import MemoryB
 from services.LLM_agent import LanguageModelProcessor
 
+# Used when questions.json is missing or fails to load
+TEST_QUESTIONS = [
+    {
+        "state": 1,
+        "question": "How many years of professional experience do you have?",
+        "expected_answer_type": "number_or_fresher_intern",
+        "max_followups": 2,
+        "response_categories": {
+            "years": "Candidate has professional experience measured in years",
+            "fresher": "Candidate is a fresher or recent graduate",
+            "incomplete": "Answer is incomplete or vague"
+        },
+        "follow_up_instructions": {
+            "years": "Great, out of {extracted_value}, how many years are relevant to this role?",
+            "fresher": "Do you have any internship experience?",
+            "incomplete": "Could you tell me more specifically about your experience?",
+            "default": "Could you clarify your professional experience?"
+        }
+    },
+    {
+        "state": 2,
+        "question": "What is your current or last CTC?",
+        "expected_answer_type": "amount_with_unit",
+        "max_followups": 2,
+        "response_categories": {
+            "amount": "Candidate has provided a specific amount",
+            "not_comfortable": "Candidate has explicitly refused to share",
+            "irrelevant": "Answer doesn't address the CTC question"
+        },
+        "follow_up_instructions": {
+            "amount": "Thank you. Out of {extracted_value}, how much is fixed?",
+            "not_comfortable": "I understand. Let's move on.",
+            "irrelevant": "Could you share your CTC figure if you're comfortable?",
+            "default": "Could you share your CTC figure if you're comfortable?"
+        }
+    },
+    {
+        "state": 3,
+        "question": "What is your expected CTC?",
+        "expected_answer_type": "amount_or_hike_or_range",
+        "max_followups": 2,
+        "response_categories": {
+            "amount": "Candidate has provided a specific amount",
+            "hike": "Candidate has provided a percentage hike",
+            "range": "Candidate has provided a range",
+            "irrelevant": "Answer doesn't address the expected CTC"
+        },
+        "follow_up_instructions": {
+            "amount": "",
+            "hike": "",
+            "range": "",
+            "irrelevant": "Could you share your expected CTC?",
+            "default": "Could you share your expected CTC?"
+        }
+    }
+]
+
 class MockConfigLoader:
     """Mock config loader for testing"""
     
@@ -86,15 +145,19 @@ class MockLLMService:
         else:
             return "Could you please provide more details?"
     
-    def process(self, text: str) -> str:
+    def process(self, text: str, cacheable: bool = False) -> str:
         """Process text and return a response"""
         # This is the actual method in the real LLM service
         # For testing, we'll just return a simple response
         return "This is a mock response from the LLM service"
 
 
-async def test_conversation_flow(questions_file: str = 'questions.json'):
-    """Test the conversation flow from start to finish with interactive user input"""
+async def test_conversation_flow(questions_file: str = 'questions.json', script_file: Optional[str] = None):
+    """
+    Test the conversation flow from start to finish with interactive user input.
+    With script_file (a JSON list of responses) the answers are taken from the file instead,
+    so the flow runs unattended; input() is only used once the script runs out.
+    """
     
     print("\n" + "="*50)
     print("INTERACTIVE CONVERSATION FLOW TEST")
@@ -122,119 +185,11 @@ async def test_conversation_flow(questions_file: str = 'questions.json'):
             print(f"Error loading questions from file: {e}")
             print("Using test questions instead")
             # Use test questions instead
-            memory_a.questions_data = [
-                {
-                    "state": 1,
-                    "question": "How many years of professional experience do you have?",
-                    "expected_answer_type": "number_or_fresher_intern",
-                    "max_followups": 2,
-                    "response_categories": {
-                        "years": "Candidate has professional experience measured in years",
-                        "fresher": "Candidate is a fresher or recent graduate",
-                        "incomplete": "Answer is incomplete or vague"
-                    },
-                    "follow_up_instructions": {
-                        "years": "Great, out of {extracted_value}, how many years are relevant to this role?",
-                        "fresher": "Do you have any internship experience?",
-                        "incomplete": "Could you tell me more specifically about your experience?",
-                        "default": "Could you clarify your professional experience?"
-                    }
-                },
-                {
-                    "state": 2,
-                    "question": "What is your current or last CTC?",
-                    "expected_answer_type": "amount_with_unit",
-                    "max_followups": 2,
-                    "response_categories": {
-                        "amount": "Candidate has provided a specific amount",
-                        "not_comfortable": "Candidate has explicitly refused to share",
-                        "irrelevant": "Answer doesn't address the CTC question"
-                    },
-                    "follow_up_instructions": {
-                        "amount": "Thank you. Out of {extracted_value}, how much is fixed?",
-                        "not_comfortable": "I understand. Let's move on.",
-                        "irrelevant": "Could you share your CTC figure if you're comfortable?",
-                        "default": "Could you share your CTC figure if you're comfortable?"
-                    }
-                },
-                {
-                    "state": 3,
-                    "question": "What is your expected CTC?",
-                    "expected_answer_type": "amount_or_hike_or_range",
-                    "max_followups": 2,
-                    "response_categories": {
-                        "amount": "Candidate has provided a specific amount",
-                        "hike": "Candidate has provided a percentage hike",
-                        "range": "Candidate has provided a range",
-                        "irrelevant": "Answer doesn't address the expected CTC"
-                    },
-                    "follow_up_instructions": {
-                        "amount": "",
-                        "hike": "",
-                        "range": "",
-                        "irrelevant": "Could you share your expected CTC?",
-                        "default": "Could you share your expected CTC?"
-                    }
-                }
-            ]
+            memory_a.questions_data = list(TEST_QUESTIONS)
     else:
         print(f"Questions file '{questions_file}' not found. Using test questions.")
         # Use test questions
-        memory_a.questions_data = [
-            {
-                "state": 1,
-                "question": "How many years of professional experience do you have?",
-                "expected_answer_type": "number_or_fresher_intern",
-                "max_followups": 2,
-                "response_categories": {
-                    "years": "Candidate has professional experience measured in years",
-                    "fresher": "Candidate is a fresher or recent graduate",
-                    "incomplete": "Answer is incomplete or vague"
-                },
-                "follow_up_instructions": {
-                    "years": "Great, out of {extracted_value}, how many years are relevant to this role?",
-                    "fresher": "Do you have any internship experience?",
-                    "incomplete": "Could you tell me more specifically about your experience?",
-                    "default": "Could you clarify your professional experience?"
-                }
-            },
-            {
-                "state": 2,
-                "question": "What is your current or last CTC?",
-                "expected_answer_type": "amount_with_unit",
-                "max_followups": 2,
-                "response_categories": {
-                    "amount": "Candidate has provided a specific amount",
-                    "not_comfortable": "Candidate has explicitly refused to share",
-                    "irrelevant": "Answer doesn't address the CTC question"
-                },
-                "follow_up_instructions": {
-                    "amount": "Thank you. Out of {extracted_value}, how much is fixed?",
-                    "not_comfortable": "I understand. Let's move on.",
-                    "irrelevant": "Could you share your CTC figure if you're comfortable?",
-                    "default": "Could you share your CTC figure if you're comfortable?"
-                }
-            },
-            {
-                "state": 3,
-                "question": "What is your expected CTC?",
-                "expected_answer_type": "amount_or_hike_or_range",
-                "max_followups": 2,
-                "response_categories": {
-                    "amount": "Candidate has provided a specific amount",
-                    "hike": "Candidate has provided a percentage hike",
-                    "range": "Candidate has provided a range",
-                    "irrelevant": "Answer doesn't address the expected CTC"
-                },
-                "follow_up_instructions": {
-                    "amount": "",
-                    "hike": "",
-                    "range": "",
-                    "irrelevant": "Could you share your expected CTC?",
-                    "default": "Could you share your expected CTC?"
-                }
-            }
-        ]
+        memory_a.questions_data = list(TEST_QUESTIONS)
     
     # Initialize Memory B
     memory_b = MemoryB()
@@ -250,9 +205,20 @@ async def test_conversation_flow(questions_file: str = 'questions.json'):
     # Manually pre-generate audio for questions instead of relying on the ConversationManager's async call
     await memory_a.pre_generate_audio(elevenlabs_service)
     
-    # Function to get user input
-    def get_user_input(prompt: str) -> str:
-        return input(prompt)
+    # Scripted responses are queued up front and consumed in order
+    scripted_responses = asyncio.Queue()
+    if script_file:
+        with open(script_file, 'rb') as f:
+            for response in orjson.loads(f.read()):
+                scripted_responses.put_nowait(response)
+    
+    # Function to get user input; input() runs in a thread so the event loop keeps running
+    async def get_user_input(prompt: str) -> str:
+        if not scripted_responses.empty():
+            response = await scripted_responses.get()
+            print(f"{prompt}{response}")
+            return response
+        return await asyncio.to_thread(input, prompt)
     
     # ==== Begin Testing Conversation Flow ====
     
@@ -268,10 +234,10 @@ async def test_conversation_flow(questions_file: str = 'questions.json'):
     
     # Step 2: First response - User says something to start the call
     print("\nSTEP 2: User says something to start the call")
-    user_response = get_user_input("Enter your response to start the call: ")
+    user_response = await get_user_input("Enter your response to start the call: ")
     
     # Buffer the response in Memory B
-    await memory_b.buffer_response(call_sid, user_response)
+    memory_b.buffer_response(call_sid, user_response)
     
     # Skip processing for state 0 and directly advance to state 1
     print("Skipping processing for state 0 and advancing directly to state 1...")
@@ -282,7 +248,7 @@ async def test_conversation_flow(questions_file: str = 'questions.json'):
     print("✅ Advanced to first question state")
     
     # Get current state
-    state = await memory_b.get_state(call_sid)
+    state = memory_b.get_state(call_sid)
     print(f"   Current state: {state.state_index}")
     
     # Main testing loop
@@ -296,7 +262,7 @@ async def test_conversation_flow(questions_file: str = 'questions.json'):
             print(f"Max Follow-ups: {current_question.get('max_followups', 2)}")
         
         # Get user response
-        user_response = get_user_input("\nEnter your response: ")
+        user_response = await get_user_input("\nEnter your response: ")
         
         # Process the response
         success, audio, error = await conversation_manager.process_response(call_sid, user_response)
@@ -308,13 +274,13 @@ async def test_conversation_flow(questions_file: str = 'questions.json'):
         # Check if a follow-up question was generated
         if audio:
             # Get and display the follow-up question from memory_b
-            updated_state = await memory_b.get_state(call_sid)
+            updated_state = memory_b.get_state(call_sid)
             if updated_state.followup_qa_pairs and len(updated_state.followup_qa_pairs) > 0:
                 follow_up_question = updated_state.followup_qa_pairs[-1][0]
                 print(f"\nFollow-up Question: {follow_up_question}")
                 
                 # Get user response to follow-up
-                user_response = get_user_input("Enter your response to the follow-up: ")
+                user_response = await get_user_input("Enter your response to the follow-up: ")
                 
                 # Process the follow-up response
                 success, audio, error = await conversation_manager.process_response(call_sid, user_response)
@@ -324,7 +290,7 @@ async def test_conversation_flow(questions_file: str = 'questions.json'):
                 print("✅ Follow-up response processed successfully")
         
         # Get updated state
-        new_state = await memory_b.get_state(call_sid)
+        new_state = memory_b.get_state(call_sid)
         
         # Display state transition information
         if new_state.state_index > state.state_index:
@@ -370,4 +336,8 @@ async def test_conversation_flow(questions_file: str = 'questions.json'):
     
 
 if __name__ == "__main__":
-    asyncio.run(test_conversation_flow())
+    parser = argparse.ArgumentParser(description="Conversation flow test")
+    parser.add_argument("--questions", default="questions.json", help="questions file to load")
+    parser.add_argument("--script", help="JSON list of user responses to replay instead of typing them")
+    args = parser.parse_args()
+    asyncio.run(test_conversation_flow(questions_file=args.questions, script_file=args.script))
@@ -1,13 +1,13 @@
 #!/usr/bin/env python3
+import asyncio
 import configparser
 import logging
 import sys
-import json
+import orjson
 import uuid
-import time
 from services.Twilio_service import TwilioService
 from utils.validators import validate_phone_no
-import boto3
+from services.aws_clients import get_client
 from botocore.exceptions import ClientError
 
 # Configure logging
@@ -27,13 +27,8 @@ def send_message_to_sqs(config, phone_number):
     aws_secret_access_key = config.get('aws', 'aws_secret_access_key')
     queue_url = config.get('aws', 'queue_url')
     
-    # Create SQS client
-    sqs = boto3.client(
-        'sqs',
-        region_name=aws_region,
-        aws_access_key_id=aws_access_key_id,
-        aws_secret_access_key=aws_secret_access_key
-    )
+    # Shared SQS client; built once per process and reused by later sends
+    sqs = get_client('sqs', aws_region, aws_access_key_id, aws_secret_access_key)
     
     # Generate a unique message ID
     message_id = str(uuid.uuid4())
@@ -48,7 +43,7 @@ def send_message_to_sqs(config, phone_number):
     # Create the outer message structure
     message_body = {
         "MessageId": message_id,
-        "Message": json.dumps(inner_message)
+        "Message": orjson.dumps(inner_message).decode()
     }
     
     logger.info(f"Message structure: {message_body}")
@@ -57,7 +52,7 @@ def send_message_to_sqs(config, phone_number):
         # Send message to SQS queue
         response = sqs.send_message(
             QueueUrl=queue_url,
-            MessageBody=json.dumps(message_body)
+            MessageBody=orjson.dumps(message_body).decode()
         )
         logger.info(f"Message sent with ID: {response['MessageId']}")
         return response['MessageId']
@@ -88,6 +83,13 @@ def initiate_direct_call(config, phone_number):
         logger.error(f"Error initiating call: {e}")
         return None
 
+async def run_end_to_end(config, phone_number):
+    """Send the SQS message and place the direct call at the same time; neither waits on the other"""
+    return await asyncio.gather(
+        asyncio.to_thread(send_message_to_sqs, config, phone_number),
+        asyncio.to_thread(initiate_direct_call, config, phone_number)
+    )
+
 def main():
     # Parse configuration
     config = configparser.ConfigParser()
@@ -109,20 +111,15 @@ def main():
     
     choice = input("\nEnter your choice (1, 2, or 3): ")
     
-    if choice == '1' or choice == '3':
+    if choice == '1':
         # Send message to SQS
         logger.info("=" * 30)
         logger.info("SENDING MESSAGE TO SQS")
         logger.info("=" * 30)
         message_id = send_message_to_sqs(config, phone_number)
         logger.info(f"Test message sent to SQS for phone number: {phone_number}")
-        
-        if choice == '3':
-            # Wait a bit for SQS processing
-            logger.info("Waiting 5 seconds to allow for SQS processing...")
-            time.sleep(5)
     
-    if choice == '2' or choice == '3':
+    if choice == '2':
         # Initiate direct call
         logger.info("=" * 30)
         logger.info("INITIATING DIRECT CALL")
@@ -130,6 +127,16 @@ def main():
         call_sid = initiate_direct_call(config, phone_number)
         if call_sid:
             logger.info(f"Call initiated to {phone_number} with SID: {call_sid}")
+    
+    if choice == '3':
+        # Both requests are blocking SDK calls, so each runs in a worker thread
+        logger.info("=" * 30)
+        logger.info("SENDING MESSAGE TO SQS AND INITIATING DIRECT CALL")
+        logger.info("=" * 30)
+        message_id, call_sid = asyncio.run(run_end_to_end(config, phone_number))
+        logger.info(f"Test message sent to SQS for phone number: {phone_number}")
+        if call_sid:
+            logger.info(f"Call initiated to {phone_number} with SID: {call_sid}")
             
     logger.info("Test completed.")
 
@@ -1,15 +1,53 @@
-import boto3
+import asyncio
 import configparser
-import time
-import json
+import orjson
 import ast
 
+from services.aws_clients import get_aio_session
+
+# Long polls run side by side on retries; each waits in its own slot on the SQS side
+CONCURRENT_POLLS = 3
+
 def load_config():
     config = configparser.ConfigParser()
     config.read('config.ini')
     return config
 
-def test_sqs_connection_and_messages():
+def parse_body(text):
+    """Parse a message body as JSON, falling back to a Python literal; returns (value, method used)"""
+    try:
+        return orjson.loads(text), "JSON"
+    except orjson.JSONDecodeError:
+        return ast.literal_eval(text), "ast.literal_eval"
+
+def pretty(value):
+    # literal_eval payloads may have non-string keys or values JSON can't represent
+    return orjson.dumps(value, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=str).decode()
+
+async def receive_messages(sqs_client, queue_url):
+    return await sqs_client.receive_message(
+        QueueUrl=queue_url,
+        MaxNumberOfMessages=10,
+        WaitTimeSeconds=20,
+        AttributeNames=['All'],
+        MessageAttributeNames=['All']
+    )
+
+async def receive_first_with_messages(sqs_client, queue_url, polls=CONCURRENT_POLLS):
+    """Run several long polls at once and return the first response that carries messages"""
+    tasks = [asyncio.create_task(receive_messages(sqs_client, queue_url)) for _ in range(polls)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            response = await next_done
+            if response.get('Messages'):
+                return response
+        return response
+    finally:
+        # Messages a cancelled poll already took stay hidden until their visibility timeout
+        for task in tasks:
+            task.cancel()
+
+async def test_sqs_connection_and_messages():
     """Test SQS connection and check for messages with multiple attempts"""
     config = load_config()
     
@@ -23,131 +61,95 @@ def test_sqs_connection_and_messages():
     print(f"Using SQS queue URL: {queue_url}")
     
     try:
-        # Create SQS client
-        sqs_client = boto3.client(
+        # Create SQS client on the shared aiobotocore session
+        session = get_aio_session()
+        async with session.create_client(
             'sqs',
             region_name=aws_region,
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key
-        )
+        ) as sqs_client:
+            # Get queue attributes to check connection, with the first long poll in flight at the same time
+            response, first_receive = await asyncio.gather(
+                sqs_client.get_queue_attributes(
+                    QueueUrl=queue_url,
+                    AttributeNames=['All']
+                ),
+                receive_messages(sqs_client, queue_url)
+            )
         
-        # Get queue attributes to check connection
-        response = sqs_client.get_queue_attributes(
-            QueueUrl=queue_url,
-            AttributeNames=['All']
-        )
+            print("Successfully connected to SQS queue!")
+            print(f"Queue attributes: {response['Attributes']}")
         
-        print("Successfully connected to SQS queue!")
-        print(f"Queue attributes: {response['Attributes']}")
+            # The attributes fetched above already include the approximate message count
+            approx_messages = int(response['Attributes'].get('ApproximateNumberOfMessages', '0'))
+            print(f"Approximate number of messages in queue: {approx_messages}")
         
-        # Try multiple times to receive messages
-        print("\nAttempting to receive messages (will try 5 times with 5 second intervals)...")
+            # An empty queue gets a single long poll; otherwise retry with exponential backoff
+            attempts = 5 if approx_messages else 1
+            print(f"\nAttempting to receive messages (will try {attempts} time(s))...")
         
-        for attempt in range(1, 6):
-            print(f"\nAttempt {attempt}/5:")
+            for attempt in range(1, attempts + 1):
+                print(f"\nAttempt {attempt}/{attempts}:")
             
-            # Check approximate number of messages
-            queue_attrs = sqs_client.get_queue_attributes(
-                QueueUrl=queue_url,
-                AttributeNames=['ApproximateNumberOfMessages']
-            )
-            approx_messages = int(queue_attrs['Attributes'].get('ApproximateNumberOfMessages', '0'))
-            print(f"Approximate number of messages in queue: {approx_messages}")
+                # Try to receive messages
+                receive_response = first_receive if attempt == 1 else await receive_first_with_messages(sqs_client, queue_url)
             
-            # Try to receive messages
-            receive_response = sqs_client.receive_message(
-                QueueUrl=queue_url,
-                MaxNumberOfMessages=10,
-                WaitTimeSeconds=10,
-                AttributeNames=['All'],
-                MessageAttributeNames=['All']
-            )
-            
-            messages = receive_response.get('Messages', [])
-            if messages:
-                print(f"Successfully received {len(messages)} message(s)!")
+                messages = receive_response.get('Messages', [])
+                if messages:
+                    print(f"Successfully received {len(messages)} message(s)!")
                 
-                for i, message in enumerate(messages):
-                    print(f"\n--- MESSAGE {i+1} DETAILS ---")
-                    print(f"Message ID: {message.get('MessageId')}")
+                    for i, message in enumerate(messages):
+                        print(f"\n--- MESSAGE {i+1} DETAILS ---")
+                        print(f"Message ID: {message.get('MessageId')}")
                     
-                    # Print raw message body
-                    print("\nRaw Message Body:")
-                    print(message['Body'])
+                        # Print raw message body
+                        print("\nRaw Message Body:")
+                        print(message['Body'])
                     
-                    try:
-                        # Try to parse as JSON first
                         try:
-                            body_json = json.loads(message['Body'])
-                            print("\nParsed as JSON:")
-                            print(json.dumps(body_json, indent=2))
-                            
-                            # Check for Message field in JSON
-                            if 'Message' in body_json:
-                                inner_message = body_json['Message']
-                                print("\nInner Message content:")
-                                print(inner_message)
-                                
-                                # Try to parse inner message
-                                try:
-                                    # Try JSON first
-                                    try:
-                                        inner_json = json.loads(inner_message)
-                                        print("\nInner message parsed as JSON:")
-                                        print(json.dumps(inner_json, indent=2))
-                                    except:
-                                        # Try ast.literal_eval as fallback
-                                        inner_dict = ast.literal_eval(inner_message)
-                                        print("\nInner message parsed with ast.literal_eval:")
-                                        print(inner_dict)
-                                    
-                                    print("\n SUCCESS: Message format appears correct!")
-                                except Exception as e:
-                                    print(f"\n ERROR: Could not parse inner message: {e}")
-                            else:
-                                print("\n ERROR: No 'Message' field found in the JSON body")
-                        except json.JSONDecodeError:
-                            # If not JSON, try ast.literal_eval
-                            body_dict = ast.literal_eval(message['Body'])
-                            print("\nParsed with ast.literal_eval:")
-                            print(body_dict)
+                            # Each string is parsed once; the fallback only runs for non-JSON payloads
+                            body, body_format = parse_body(message['Body'])
+                            print(f"\nParsed with {body_format}:")
+                            print(pretty(body))
                             
                             # Check for Message field
-                            if 'Message' in body_dict:
-                                inner_message = body_dict['Message']
+                            if 'Message' in body:
+                                inner_message = body['Message']
                                 print("\nInner Message content:")
                                 print(inner_message)
                                 
                                 # Try to parse inner message
                                 try:
-                                    inner_dict = ast.literal_eval(inner_message)
-                                    print("\nInner message parsed:")
-                                    print(inner_dict)
+                                    inner_body, inner_format = parse_body(inner_message)
+                                    print(f"\nInner message parsed with {inner_format}:")
+                                    print(pretty(inner_body))
                                     print("\n SUCCESS: Message format appears correct!")
                                 except Exception as e:
                                     print(f"\n ERROR: Could not parse inner message: {e}")
                             else:
                                 print("\n ERROR: No 'Message' field found in the body")
-                    except Exception as e:
-                        print(f"\n ERROR: Could not parse message body: {e}")
+                        except Exception as e:
+                            print(f"\n ERROR: Could not parse message body: {e}")
                     
-                    # Don't delete the message so we can see it in future tests
-                    print("\nMessage left in queue for future tests.")
+                        # Don't delete the message so we can see it in future tests
+                        print("\nMessage left in queue for future tests.")
                 
-                return True
-            else:
-                print("No messages received in this attempt.")
+                    return True
+                else:
+                    print("No messages received in this attempt.")
             
-            if attempt < 5:
-                print(f"Waiting 5 seconds before next attempt...")
-                time.sleep(5)
+                if attempt < attempts:
+                    delay = min(2 ** (attempt - 1), 8)
+                    print(f"Waiting {delay} seconds before next attempt...")
+                    await asyncio.sleep(delay)
         
-        print("\nNo messages found after 5 attempts.")
-        return False
+            print(f"\nNo messages found after {attempts} attempt(s).")
+            return False
     except Exception as e:
         print(f"Error: {e}")
         return False
 
 if __name__ == "__main__":
-    success = test_sqs_connection_and_messages()
+    success = asyncio.run(test_sqs_connection_and_messages())
     print(f"\nTest {'succeeded' if success else 'failed'}")
@@ -0,0 +1,38 @@
+import hashlib
+from collections import OrderedDict
+
+
+class RecentMessageSet:
+    """
+    Bounded set of recently seen message bodies.
+    Bodies are stored as 16-byte blake2b digests and the least recently seen
+    entry is evicted once maxsize is reached, so memory stays constant.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self.digests = OrderedDict()
+
+    @staticmethod
+    def _digest(body: str) -> bytes:
+        return hashlib.blake2b(body.encode(), digest_size=16).digest()
+
+    def __contains__(self, body: str) -> bool:
+        return self._digest(body) in self.digests
+
+    def __len__(self) -> int:
+        return len(self.digests)
+
+    def add(self, body: str) -> None:
+        self.check_and_add(body)
+
+    def check_and_add(self, body: str) -> bool:
+        """Record body as seen; returns True if it was not seen before"""
+        key = self._digest(body)
+        if key in self.digests:
+            self.digests.move_to_end(key)
+            return False
+        self.digests[key] = None
+        if len(self.digests) > self.maxsize:
+            self.digests.popitem(last=False)
+        return True
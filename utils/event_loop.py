@@ -0,0 +1,15 @@
+import logging
+
+try:
+    import uvloop
+except ImportError:  # uvloop is optional and not available on Windows
+    uvloop = None
+
+
+def install_uvloop() -> bool:
+    """Use the libuv-based uvloop event loop when it is installed; returns True if it was"""
+    if uvloop is None:
+        logging.getLogger(__name__).info("uvloop not installed, using the default asyncio event loop")
+        return False
+    uvloop.install()
+    return True
@@ -0,0 +1,79 @@
+import asyncio
+import binascii
+import functools
+from typing import Optional
+
+import orjson
+
+
+_END_OF_STREAM = object()
+
+
+def buffered(aiterable, n=4, spawn=asyncio.create_task, batch=False, timeout=None, first_timeout=None):
+    """
+    Pull items from an async iterable in a background task, keeping up to n items ready.
+    The producer starts immediately, so the source keeps draining while the consumer is busy.
+    With batch=True each iteration yields a list of every item that is ready at that point.
+    If no item arrives within timeout seconds, asyncio.TimeoutError is raised to the consumer.
+    first_timeout, if given, replaces timeout for the first item, e.g. to allow for queueing
+    behind a concurrency limit before the source starts.
+    """
+    queue = asyncio.Queue(maxsize=n)
+    errors = []
+    
+    async def produce():
+        try:
+            async for item in aiterable:
+                await queue.put(item)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            errors.append(e)
+        await queue.put(_END_OF_STREAM)
+    
+    producer = spawn(produce())
+    
+    async def consume():
+        wait = timeout if first_timeout is None else first_timeout
+        try:
+            while True:
+                item = await asyncio.wait_for(queue.get(), wait)
+                wait = timeout
+                if item is _END_OF_STREAM:
+                    break
+                if not batch:
+                    yield item
+                    continue
+                
+                # Drain whatever else is already buffered without waiting
+                items = [item]
+                while not queue.empty():
+                    item = queue.get_nowait()
+                    if item is _END_OF_STREAM:
+                        break
+                    items.append(item)
+                yield items
+                if item is _END_OF_STREAM:
+                    break
+            if errors:
+                raise errors[0]
+        finally:
+            producer.cancel()
+    
+    return consume()
+
+
+# Twilio media messages only differ in the stream SID and the payload, so the
+# envelope around the payload is built once per stream instead of per chunk
+MEDIA_SUFFIX = '"}}'
+
+
+def encode_payload(chunk: bytes) -> str:
+    """Base64-encode raw audio for a Twilio media payload (binascii skips base64.b64encode's wrapper)"""
+    return binascii.b2a_base64(chunk, newline=False).decode('ascii')
+
+
+@functools.lru_cache(maxsize=1024)
+def build_media_prefix(stream_sid: Optional[str]) -> str:
+    """Build the part of a Twilio media message that precedes the payload"""
+    return '{"event": "media", "streamSid": ' + orjson.dumps(stream_sid).decode() + ', "media": {"payload": "'
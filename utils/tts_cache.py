@@ -0,0 +1,71 @@
+import asyncio
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+TTS_CACHE_DIR = "tts_cache"
+
+
+class TTSCache:
+    """
+    Content-addressed on-disk cache for pre-generated TTS audio.
+    Audio is deterministic for a given (text, voice, model, voice settings), so
+    files are keyed by a sha256 of those and re-used across server restarts.
+    """
+
+    def __init__(self, cache_dir: str = TTS_CACHE_DIR):
+        self.cache_dir = Path(cache_dir)
+        # cache key -> task generating that audio, so concurrent identical requests share one call
+        self.pending = {}
+        self.logger = logging.getLogger(__name__)
+
+    @staticmethod
+    def cache_key(tts_service, text: str) -> str:
+        voice_id = getattr(tts_service, "tts_voice_id", "")
+        model = getattr(tts_service, "elevenlabs_model", "")
+        settings = json.dumps(getattr(tts_service, "voice_settings", None), sort_keys=True, default=str)
+        return hashlib.sha256(f"{text}|{voice_id}|{model}|{settings}".encode()).hexdigest()
+
+    def _read(self, path: Path):
+        return path.read_bytes() if path.exists() else None
+
+    def _write(self, path: Path, audio_data: bytes) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file first so a crash never leaves a truncated entry behind
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_bytes(audio_data)
+        tmp_path.replace(path)
+
+    async def text_to_speech_full(self, tts_service, text: str) -> bytes:
+        """Return cached audio for text, generating and storing it on a miss"""
+        key = self.cache_key(tts_service, text)
+        task = self.pending.get(key)
+        if task is None:
+            task = self.pending[key] = asyncio.ensure_future(self._load_or_generate(tts_service, text, key))
+            task.add_done_callback(lambda _: self.pending.pop(key, None))
+        # Shielded so one cancelled caller doesn't cancel the request for the others
+        return await asyncio.shield(task)
+
+    async def _load_or_generate(self, tts_service, text: str, key: str) -> bytes:
+        path = self.cache_dir / f"{key}.ulaw"
+        try:
+            audio_data = await asyncio.to_thread(self._read, path)
+            if audio_data:
+                return audio_data
+        except OSError as e:
+            self.logger.warning(f"Could not read TTS cache entry {path}: {e}")
+
+        audio_data = await tts_service.text_to_speech_full(text)
+
+        # Empty audio means generation failed; don't cache it
+        if audio_data:
+            try:
+                await asyncio.to_thread(self._write, path, audio_data)
+            except OSError as e:
+                self.logger.warning(f"Could not write TTS cache entry {path}: {e}")
+        return audio_data
+
+
+# Shared by Memory A and Memory C so texts they have in common are generated once
+tts_cache = TTSCache()
@@ -1,7 +1,12 @@
 import re
 import logging
+from functools import lru_cache
 from logger.logger_config import logger
 
+# Very permissive validation - just check for + followed by digits
+# This will accept almost any phone number starting with +
+PHONE_NO_RE = re.compile(r'^\+\d+')
+
 def validate_phone_no(phone_no):
     """
     Validates that a phone number is in the E.164 format which Twilio requires.
@@ -9,27 +14,31 @@ def validate_phone_no(phone_no):
     E.164 format: [+][country code][subscriber number]
     Example: +14155552671
     
+    Results for string inputs are cached, so a number that is seen again
+    (e.g. a redelivered SQS message) is not re-validated or re-logged.
+    
     Args:
         phone_no (str): The phone number to validate
         
     Returns:
         bool: True if the phone number is valid, False otherwise
     """
-    try:
-        # Log the received phone number for debugging
+    if not isinstance(phone_no, str):
+        logger.warning(f"Invalid phone number type: {type(phone_no).__name__}. Expected a string")
+        return False
+    return _validate_phone_no(phone_no)
+
+@lru_cache(maxsize=4096)
+def _validate_phone_no(phone_no):
+    # Skip building the debug messages when INFO is filtered out
+    log_info = logger.isEnabledFor(logging.INFO)
+    if log_info:
         logger.info(f"Validating phone number: {phone_no}")
-        
-        # Very permissive validation - just check for + followed by digits
-        # This will accept almost any phone number starting with +
-        pattern = r'^\+\d+'
-        
-        if re.match(pattern, phone_no):
+    
+    if PHONE_NO_RE.match(phone_no):
+        if log_info:
             logger.info(f"Phone number {phone_no} is valid")
-            return True
-        else:
-            logger.warning(f"Invalid phone number format: {phone_no}. Must start with + followed by digits")
-            return False
-            
-    except Exception as e:
-        logger.error(f"Error validating phone number: {str(e)}")
-        return False
\ No newline at end of file
+        return True
+    
+    logger.warning(f"Invalid phone number format: {phone_no}. Must start with + followed by digits")
+    return False